@@ -1,24 +1,23 @@
 #!/usr/bin/env python
 
-from pinyin import get as pget
 from number_variable_dfa import NumberVariableDfa
 from string_dfa import StringDfa, MultilineStringDfa
-from cha_token import Token, WhitespaceToken, EndToken, SymbolToken, ReservedWordToken, VariableToken, ParseToken, StringToken, MultilineStringToken
-from cha_translation import reserved_symbols, symbol_order, reserved_beginning_words, NeedsSpace, PyToCha
+from regex_lexer import RegexLexer
+from cha_token import Token, WhitespaceToken, EndToken, SymbolToken, ReservedWordToken, VariableToken, ParseToken, StringToken, MultilineStringToken, pinyin_cache
+from cha_identifiers import IdentifierTable, IDENTIFIERS_NAME
+from cha_manifest import BuildManifest, MANIFEST_NAME
+from cha_io import AtomicWriter, ReadLines
+from cha_translation import reserved_symbols, symbol_trie, LongestMatch, MatchBeginningWord, PyToCha, spacing_kinds, spacing_table, PLAIN
+from collections import OrderedDict
+import cha_token
+import cha_translation
 import sys
-from pathlib import Path
+import time
 
 import os
 
-def LastModifiedTime(path):
-  # https://stackoverflow.com/questions/237079/how-to-get-file-creation-modification-date-times-in-python
-  return os.path.getmtime(path)
-
-# To check if the files need any updating.
-_CHA2_MODIFIED_TIME = LastModifiedTime(sys.argv[0])
-
-_OVERRIDE_ALL = any(a == '-y' for a in sys.argv)
-_UPDATE_ALL = any(a == '-u' for a in sys.argv)
+# The files translation depends on, for comparing times without a manifest.
+_TRANSLATOR_FILES = (__file__, cha_token.__file__, cha_translation.__file__)
 
 class ChaParseException(Exception): pass
 class ChaNotImplementedException(Exception):
@@ -45,6 +44,65 @@ unsupported_symbols = {
 }
 
 WHITESPACE_CHARS = frozenset((' ', '\n', '\t'))
+# For str.translate, removes all whitespace characters.
+_REMOVE_WHITESPACE = {ord(c): None for c in WHITESPACE_CHARS}
+
+def HasWord(line, words):
+  """Returns whether any of words is in line, ignoring whitespace.
+
+  The tokenizers remove whitespace before finding words, so 引 进 is the
+  same as 引进.
+
+  Args:
+    line: string A line of .cha.
+    words: Iterable[string] The words to look for.
+  """
+  if any(w in line for w in words):
+    return True
+  # Whitespace is only removed when every character of a word is there.
+  if not any(all(c in line for c in w) for w in words):
+    return False
+  line = line.translate(_REMOVE_WHITESPACE)
+  return any(w in line for w in words)
+
+# How many translated lines each ChaParser remembers, see ChaParser.ParseLine.
+LINE_CACHE_SIZE = 10000
+# Words only found in lines which import modules, see ImportedModules.
+_IMPORT_WORDS = (PyToCha['import'], PyToCha['from'])
+
+# Ways ChaParser can tokenize a line. The pipeline is the reference
+# implementation, the fused tokenizer gives the same tokens in a single pass,
+# and the regex tokenizer with a single regular expression.
+TOKENIZERS = ('pipeline', 'fused', 'regex')
+
+def TokenizerOption(args):
+  """Returns the tokenizer chosen by the -f or -r command line flags."""
+  if '-r' in args:
+    return 'regex'
+  if '-f' in args:
+    return 'fused'
+  return 'pipeline'
+
+def FindIdentifiers(directory, tables=None):
+  """Returns the IdentifierTable of the project in directory, if it has one.
+
+  Converted projects name their modules and variables from the table, so
+  code translated without converting files uses it too, to match.
+
+  Args:
+    directory: string The directory of the project.
+    tables: Optional[dict] Tables already opened, by path, to reuse.
+  Returns:
+    Optional[IdentifierTable] None if directory has no table.
+  """
+  path = os.path.join(directory, IDENTIFIERS_NAME)
+  if not os.path.isfile(path):
+    return None
+  if tables is None:
+    return IdentifierTable(path, CHAR_TO_VAR_BASE)
+  if path not in tables:
+    tables[path] = IdentifierTable(path, CHAR_TO_VAR_BASE)
+  return tables[path]
 
 def _DefinesClass(tokens):
   """Determines if a line of tokens is attempting to define a class."""
@@ -62,16 +120,32 @@ def HandleClassDefinitions(tokens):
   if _DefinesClass(tokens):
     _AddChaObjectToClass(tokens)
 
-def ShouldOverride(source, dest):
-  """Determines if a given file and destination file should be overridden."""
-  if (not _UPDATE_ALL and
-      LastModifiedTime(dest) > LastModifiedTime(source) and
-      LastModifiedTime(dest) > _CHA2_MODIFIED_TIME):
+def IsNewer(path, others):
+  """Returns whether path was modified after every one of others."""
+  modified = os.path.getmtime(path)
+  return all(modified > os.path.getmtime(other) for other in others)
+
+def ShouldOverride(source, dest, interactive=True, manifest=None, update_all=False):
+  """Determines if a given file and destination file should be overridden.
+
+  Files the manifest says are up to date are not overridden, unless
+  update_all. Without a manifest, files written after the source and the
+  translator last changed are taken to be up to date. Out of date files which
+  the manifest recorded converting are overridden without asking, as are all
+  files when not interactive.
+  """
+  if manifest is not None:
+    up_to_date = manifest.IsUpToDate(source, dest)
+  else:
+    up_to_date = IsNewer(dest, (source,) + _TRANSLATOR_FILES)
+  if not update_all and up_to_date:
     print('File up to date: ' + dest)
     return False
-  if _OVERRIDE_ALL:
+  if not interactive:
     return True
-  user_input = input('%s already exists, proceed and overwrite? [y|N]: ' % dest_file)
+  if manifest is not None and manifest.IsGenerated(dest):
+    return True
+  user_input = input('%s already exists, proceed and overwrite? [y|N]: ' % dest)
   if not user_input.lower().startswith('y'):
      print('Not overriding file, stopping this conversion')
      return False
@@ -104,15 +178,67 @@ def PrettyPrintTokens(tokens):
     print(string)
 
 class ChaParser:
-  def __init__(self, directory=''):
+  def __init__(self, directory='', tokenizer='pipeline', interactive=True, manifest=None,
+               convert_imports=True, identifiers=None, update_all=False):
+    if tokenizer not in TOKENIZERS:
+      raise ChaParseException('Unknown tokenizer: %s' % tokenizer)
     self.char_to_var = dict(CHAR_TO_VAR_BASE)
     self.var_to_char = dict(VAR_TO_CHAR_BASE)
     self.multiline_string_dfa = MultilineStringDfa('“', '”')
     self.string_dfa = StringDfa('“', '”')
     self.number_variable_dfa = NumberVariableDfa()
+    # Built on first use by TokenizeRegex, as compiling its patterns is slow.
+    self.regex_lexer = None
+    self.cwd = directory
+    self.imported_files = set()
+    self.tokenizer = tokenizer
+    # Whether to ask before overwriting existing files.
+    self.interactive = interactive
+    # Whether to convert files even if the manifest says they are up to date.
+    self.update_all = update_all
+    # Optional BuildManifest recording the files this parser converts.
+    self.manifest = manifest
+    # Whether imported .cha files are converted to .py files while parsing.
+    self.convert_imports = convert_imports
+    # Functions called with the timing of each stage, see AddStageCallback.
+    self.stage_callbacks = []
+    # The .cha file being converted, None when parsing lines on their own.
+    self.source = None
+    # Maps each converted .cha file to the .cha files it was found to import.
+    self.imports = {}
+    # Optional IdentifierTable naming variables instead of char_to_var.
+    self.identifiers = identifiers
+    # Maps (line, whether it starts inside a multiline string) to its
+    # translation, the names of its variables and whether the next line
+    # starts inside a multiline string. Kept between files.
+    self.line_cache = OrderedDict()
+    self.line_cache_size = LINE_CACHE_SIZE
+    self.line_hits = 0
+    self.line_misses = 0
+
+  def Reset(self, directory=''):
+    """Forgets the previous file, keeping the tables and caches already built.
+
+    Args:
+      directory: Optional[string] The directory of the next file.
+    """
+    self.char_to_var = dict(CHAR_TO_VAR_BASE)
+    self.var_to_char = dict(VAR_TO_CHAR_BASE)
+    self.ResetLineState()
     self.cwd = directory
     self.imported_files = set()
 
+  def ResetLineState(self, inside=False):
+    """Puts the automata at the start of a line, keeping the variable names.
+
+    Args:
+      inside: Optional[bool] Whether the line starts inside a multiline string.
+    """
+    self.multiline_string_dfa.inside = inside
+    self.multiline_string_dfa.state = self.multiline_string_dfa.START
+    self.string_dfa.state = self.string_dfa.START
+    self.number_variable_dfa.state = self.number_variable_dfa.START
+
   def destroy(self):
     self.char_to_var = None
     self.var_to_char = None
@@ -128,7 +254,7 @@ class ChaParser:
         whitespace += token
       else:
         break
-    token = WhitespaceToken(whitespace)
+    token = WhitespaceToken.Intern(whitespace)
     if PyToCha['#'] in tokens:
       # import pdb; pdb.set_trace()
       idx = tokens.index(PyToCha['#'])
@@ -137,73 +263,193 @@ class ChaParser:
         import pdb; pdb.set_trace()
       tokens = [*tokens[:idx], EndToken(''.join(comment_tokens))]
     else:
-      tokens.append(EndToken())
+      tokens.append(EndToken.Intern(''))
 
     f = filter(lambda t: not isinstance(t, str) or t not in WHITESPACE_CHARS, tokens[len(whitespace):])
     return [token, *[t for t in f]]
 
   def SymbolsReplaceTokens(self, tokens):
-      """Replaces symbol characters symbol tokens."""
-      result = list(tokens)
-      for symbol in symbol_order:
-        if not symbol: continue
-        for i in range(len(result) - len(symbol) + 1):
-          found = True
-          for j in range(len(symbol)):
-            if symbol[j] != result[i + j]:
-              found = False
-              break
-          if not found:
-            continue
-          # import pdb; pdb.set_trace()
-          result[i] = SymbolToken(symbol)
-          for j in range(len(symbol) - 1):
-            result[i + j + 1] = False
-      return [t for t in filter(lambda x: bool(x), result)]
+    """Replaces symbol characters with symbol tokens.
+
+    Makes a single left to right pass, taking the longest symbol that starts
+    at each position.
+    """
+    result = []
+    i = 0
+    while i < len(tokens):
+      symbol = LongestMatch(symbol_trie, tokens, i)
+      if symbol:
+        result.append(SymbolToken.Intern(symbol))
+        i += len(symbol)
+      else:
+        result.append(tokens[i])
+        i += 1
+    return result
 
   def ReservedWordsReplaceTokens(self, tokens):
-    """Replaces reserved names such as class, def, and so on."""
-    for word in reserved_beginning_words:
-      if not word: continue
-      found = True
-      for i in range(len(word)):
-        # These only need to be checked at the beginning.
-        if tokens[i + 1] != word[i]:
-          found = False
-          break
-      if not found: continue
-      tokens[1] = ReservedWordToken(word)
-      for i in range(1, len(word)):
-        tokens[i + 1] = False
-    return [t for t in filter(lambda t: bool(t), tokens)]
+    """Replaces reserved names such as class, def, and so on.
+
+    These only need to be checked at the beginning, right after whitespace.
+    """
+    match = MatchBeginningWord(tokens, 1)
+    if match is None:
+      return tokens
+    word, end = match
+    return [tokens[0], ReservedWordToken.Intern(word), *tokens[end:]]
+
+  def MayHaveStrings(self, line):
+    """Whether a line may hold strings, checked without going through its characters.
+
+    Lines outside of multiline strings without an opening quote pass through
+    the string automata unchanged, so tokenizers skip them.
+    """
+    return (self.multiline_string_dfa.inside or
+            self.multiline_string_dfa.start_quote in line)
 
   def Tokenize(self, line):
-    tokens = [c for c in line]
-    tokens = self.multiline_string_dfa.ReplaceTokens(
-        tokens,
-        self.multiline_string_dfa.inside)
-    # print('1: %s', tokens)
-    tokens = self.string_dfa.ReplaceTokens(tokens)
-    # print('2: %s', tokens)
-    tokens = self.WhitespaceReplaceTokens(tokens)
-    # print('3: %s', tokens)
-    tokens = self.ReservedWordsReplaceTokens(tokens)
-    # print('4: %s', tokens)
-    tokens = self.SymbolsReplaceTokens(tokens)
-    # print('5: %s', tokens)
-    tokens = self.number_variable_dfa.ReplaceTokens(tokens)
-    # print('6: %s', tokens)
+    """Splits a line of .cha into Tokens, using the chosen tokenizer."""
+    if self.tokenizer == 'fused':
+      return self.TokenizeFused(line)
+    if self.tokenizer == 'regex':
+      return self.TokenizeRegex(line)
+    return self.TokenizePipeline(line)
+
+  def AddStageCallback(self, callback):
+    """Calls callback after each stage of parsing a line.
+
+    Stages are 'tokenize', 'imports' and 'join' for each line, and within
+    'tokenize' each stage of TokenizePipeline. 'imports' includes converting
+    any imported files.
+
+    Args:
+      callback: function(string, number, any) Called with the stage name,
+          the seconds it took and its result.
+    """
+    self.stage_callbacks.append(callback)
+
+  def RemoveStageCallback(self, callback):
+    """Stops calling a callback added with AddStageCallback."""
+    self.stage_callbacks.remove(callback)
+
+  def Stage(self, name, fn, *args):
+    """Runs one stage of parsing, timing it if there are stage callbacks."""
+    if not self.stage_callbacks:
+      return fn(*args)
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    for callback in self.stage_callbacks:
+      callback(name, seconds, result)
+    return result
+
+  def TokenizePipeline(self, line):
+    """Tokenizes a line by passing its characters through each stage."""
+    tokens = self.Stage('characters', list, line)
+    if self.MayHaveStrings(line):
+      tokens = self.Stage(
+          'multiline_string_dfa',
+          self.multiline_string_dfa.ReplaceTokens,
+          tokens,
+          self.multiline_string_dfa.inside)
+      tokens = self.Stage('string_dfa', self.string_dfa.ReplaceTokens, tokens)
+    tokens = self.Stage('whitespace', self.WhitespaceReplaceTokens, tokens)
+    tokens = self.Stage('reserved_words', self.ReservedWordsReplaceTokens, tokens)
+    tokens = self.Stage('symbols', self.SymbolsReplaceTokens, tokens)
+    tokens = self.Stage('number_variable_dfa', self.number_variable_dfa.ReplaceTokens, tokens)
     for t in tokens:
       if isinstance(t, str):
         raise ChaParseException('Character not parsed: %s' % t)
     return tokens
 
+  def TokenizeFused(self, line):
+    """Tokenizes a line in a single pass over its text.
+
+    Gives the same Tokens as TokenizePipeline, but handles whole runs of text
+    at a time rather than creating lists of characters for each stage.
+    """
+    spans = ()
+    if self.MayHaveStrings(line):
+      spans = self.multiline_string_dfa.FindSpans(
+          line,
+          self.multiline_string_dfa.inside)
+    pieces, comment = self.string_dfa.SplitLine(line, spans)
+
+    whitespace = ''
+    if pieces and isinstance(pieces[0], str):
+      text = pieces[0]
+      whitespace = text[:len(text) - len(text.lstrip(' \t'))]
+    tokens = [WhitespaceToken.Intern(whitespace)]
+    at_beginning = True
+    for piece in pieces:
+      if not isinstance(piece, str):
+        tokens.append(piece)
+        at_beginning = False
+        continue
+      text = piece.translate(_REMOVE_WHITESPACE)
+      if not text:
+        continue
+      start = 0
+      if at_beginning:
+        at_beginning = False
+        match = MatchBeginningWord(text)
+        if match is not None:
+          word, start = match
+          tokens.append(ReservedWordToken.Intern(word))
+      self.AddTextTokens(text, start, tokens)
+    tokens.append(EndToken.Intern('') if comment is None else EndToken(comment))
+    return tokens
+
+  def TokenizeRegex(self, line):
+    """Tokenizes a line with a single regular expression, see RegexLexer.
+
+    Gives the same Tokens as TokenizePipeline.
+    """
+    spans = ()
+    if self.MayHaveStrings(line):
+      spans = self.multiline_string_dfa.FindSpans(
+          line,
+          self.multiline_string_dfa.inside)
+    if self.regex_lexer is None:
+      self.regex_lexer = RegexLexer('“', '”')
+    return self.regex_lexer.Tokenize(line, spans, self.number_variable_dfa.WordToken)
+
+  def AddTextTokens(self, text, start, tokens):
+    """Adds the symbols, numbers and variables in text to tokens.
+
+    Args:
+      text: string Text without whitespace, strings or comments.
+      start: number The index in text to start from.
+      tokens: Array[Token] The tokens to add to.
+    """
+    word_start = i = start
+    while i < len(text):
+      symbol = LongestMatch(symbol_trie, text, i)
+      if not symbol:
+        i += 1
+        continue
+      if word_start < i:
+        tokens.append(self.number_variable_dfa.WordToken(text[word_start:i]))
+      tokens.append(SymbolToken.Intern(symbol))
+      i += len(symbol)
+      word_start = i
+    if word_start < len(text):
+      tokens.append(self.number_variable_dfa.WordToken(text[word_start:]))
+
   def Translate(self, t):
     if isinstance(t, VariableToken):
+      if self.identifiers is not None:
+        return self.identifiers.Get(t.GetValue())
       return t.Translate(self.char_to_var, self.var_to_char)
     return t.Translate()
 
-  def HandleImports(self, tokens):
+  def ImportedModules(self, tokens):
+    """Finds the .cha modules a line of tokens imports.
+
+    Args:
+      tokens: Array[Token] A tokenized line.
+    Yields:
+      Token the token naming each imported module, as it is found.
+    """
     seen_from = False
     for i in range(1, len(tokens) - 1):
       piece = self.Translate(tokens[i])
@@ -211,19 +457,30 @@ class ChaParser:
       if piece == 'from' or (not seen_from and piece == 'import'):
         seen_from = piece == 'from'
         if next.GetValue() != self.Translate(next):
-          other_file = next.GetValue()
-          self.Convert(self.cwd + next.GetValue() + '.cha',
-                       self.cwd + self.Translate(next) + '.py')
-        # Translate the file defined by right
+          yield next
       elif piece == 'import':
         seen_from = False
 
+  def HandleImports(self, tokens):
+    for module in self.ImportedModules(tokens):
+      other_file = self.cwd + module.GetValue() + '.cha'
+      if self.source is not None:
+        self.imports[self.source].add(other_file)
+      # Translate the file defined by module
+      self.Convert(other_file, self.cwd + self.Translate(module) + '.py')
+
   def ParseLine(self, line):
     """Parses a single line of .cha to python.
 
     As a side effect, modifies char_to_var and var_to_char with new
     variable names if applicable.
 
+    Lines translated before are taken from line_cache. Their variables are
+    named again in order, changing char_to_var and var_to_char the same way
+    translating would, and the line is only translated again if any name
+    differs from the remembered one. Lines which may convert imported files
+    are always translated.
+
     Args:
       line: string a line of cha.
     Raises:
@@ -231,33 +488,95 @@ class ChaParser:
     Returns:
       str: a string of .py code
     """
-    tokens = self.Tokenize(line)
+    key = (line, self.multiline_string_dfa.inside)
+    entry = self.line_cache.get(key)
+    if entry is not None:
+      python, variables, inside = entry
+      if all(self.Translate(t) == name for t, name in variables):
+        self.line_cache.move_to_end(key)
+        self.line_hits += 1
+        self.multiline_string_dfa.inside = inside
+        return python
+    self.line_misses += 1
+
+    may_import = HasWord(line, _IMPORT_WORDS)
+    tokens = self.Stage('tokenize', self.Tokenize, line)
+    python = self.ParseTokens(tokens, may_import)
+    if self.line_cache_size and not (self.convert_imports and may_import):
+      variables = tuple((t, self.Translate(t)) for t in dict.fromkeys(
+          t for t in tokens if isinstance(t, VariableToken)))
+      self.line_cache[key] = (python, variables, self.multiline_string_dfa.inside)
+      self.line_cache.move_to_end(key)
+      if len(self.line_cache) > self.line_cache_size:
+        self.line_cache.popitem(last=False)
+    return python
+
+  def ParseTokens(self, tokens, may_import=True):
+    """Parses a tokenized line of .cha to python, the same as ParseLine.
 
+    Args:
+      tokens: Array[Token] A tokenized line, changed in place by class definitions.
+      may_import: Optional[bool] False if the line has neither import word,
+          so imports need not be looked for.
+    Returns:
+      str: a string of .py code
+    """
     HandleClassDefinitions(tokens)
 
-    self.HandleImports(tokens)
+    if self.convert_imports and may_import:
+      self.Stage('imports', self.HandleImports, tokens)
 
-    # Bring tokens together.
-    translation = self.Translate(tokens[0])
-    for i in range(1, len(tokens) - 1):
-      if i == len(tokens) - 2:
-        left = tokens[i]
-        piece = self.Translate(left)
-        translation += piece
-        continue
-      left, right = tokens[i], tokens[i + 1]
-      translation += self.Translate(left)
-      if NeedsSpace(left, right):
-        translation += ' '
+    return self.Stage('join', self.JoinTokens, tokens)
+
+  def JoinTokens(self, tokens):
+    """Brings the translations of a line of tokens together.
+
+    Each token is translated once, and the spacing between two neighbours is
+    looked up from the kinds of their translations.
+    """
+    texts = [self.Translate(t) for t in tokens]
+    last = len(texts) - 2
+    pieces = [texts[0]]
+    if last > 0:
+      kinds = [spacing_kinds.get(text, PLAIN) for text in texts[1:last + 1]]
+      for i in range(last - 1):
+        pieces.append(texts[i + 1])
+        if spacing_table[kinds[i]][kinds[i + 1]]:
+          pieces.append(' ')
+      pieces.append(texts[last])
     # TODO: Perhaps also add newline separation for semicolons?
-    end = self.Translate(tokens[-1])
-    if end:
-      if translation.strip():
-        translation += '  '
-      translation += end
-    return translation
-
-  def Convert(self, source, dest, space_per_indent=2, use_tabs=False):
+    translation = ''.join(pieces)
+    end = texts[-1]
+    if not end:
+      return translation
+    if translation.strip():
+      return translation + '  ' + end
+    return translation + end
+
+  def TranslateLines(self, lines, header=False):
+    """Translates lines of .cha as they are read.
+
+    Lines are only read as the result is iterated, so this works on streams
+    of any length. Multiline strings may continue across lines.
+
+    e.g.
+    ''.join(ChaParser().TranslateLines(sys.stdin))
+
+    Args:
+      lines: Iterable[string] Lines of .cha, such as an open file.
+      header: Optional[bool] Whether to start with the cha_base import.
+    Yields:
+      string Each line of .py, ending with a newline.
+    """
+    if header:
+      yield 'from cha_base import *\n'
+    for line in lines:
+      l = self.ParseLine(line)
+      if not l.endswith('\n'):
+        l += '\n'
+      yield l
+
+  def Convert(self, source, dest, space_per_indent=2, use_tabs=False, update=False):
     """Open and convert a single .cha file to the equivalent .py file
 
     Args:
@@ -265,11 +584,12 @@ class ChaParser:
       dest: string a filename to write to.
       space_per_indent: number How many spaces to convert each space to.
       use_tabs: boolean Whether to use tabs instead of spaces. Overrides space_per_indent
+      update: boolean Whether to convert even if dest exists and looks up to date.
 
     Raises:
       Exception: An exception if something goes wrong with the conversion
     """
-    if not Path(source).is_file():
+    if not os.path.isfile(source):
       raise ChaParseException('File does not exist! %s' % source)
 
     # Do not do duplicate parsing.
@@ -279,18 +599,20 @@ class ChaParser:
     self.imported_files.add(source)
 
     # If it looks like it already exists, determine if it should be handled.
-    if Path(dest).is_file() and not ShouldOverride(source, dest):
+    if (os.path.isfile(dest) and not update and
+        not ShouldOverride(source, dest, self.interactive, self.manifest, self.update_all)):
       return
 
-    with open(source, 'r') as f:
-      with open(dest, 'w') as write_file:
-        print('Exporting to ' + dest)
-        write_file.write('from cha_base import *\n')
-        for line in f.readlines():
-          l = self.ParseLine(line)
-          if not l.endswith('\n'):
-            l += '\n'
-          write_file.write(l)
+    print('Exporting to ' + dest)
+    previous_source, self.source = self.source, source
+    self.imports[source] = set()
+    try:
+      with AtomicWriter(dest) as write_file:
+        write_file.writelines(self.TranslateLines(ReadLines(source), header=True))
+    finally:
+      self.source = previous_source
+    if self.manifest is not None:
+      self.manifest.Record(source, dest)
     print('Finished converting %s to %s' % (source, dest))
 
 def help_command():
@@ -299,18 +621,54 @@ def help_command():
 To use:
 $> cha2.py FILE_TO_CONVERT
 
+Or to translate from stdin to stdout, without converting imported files:
+$> cha2.py - < FILE_TO_CONVERT > OUTPUT
+
+Or to convert the files in a directory again whenever they change:
+$> cha2.py --watch [DIRECTORY]
+
 Optionals:
   -y  Override all values
-  -u  Update all files encountered regardless of age.
+  -u  Update all files encountered even if they are up to date.
+  -f  Use the single pass tokenizer.
+  -r  Use the regular expression tokenizer.
+  --profile  Print how long each stage took, to stderr.
+
+Environment:
+  CHA_PINYIN_TABLE  A file to load pinyin lookups from, and save them to.
 """)
 
 if __name__ == '__main__':
+  from cha_profile import Profile
+
   args = sys.argv
   if len(args) < 2:
     help_command()
     exit(0)
 
+  if args[1] == '--watch':
+    from cha_watch import Watcher
+    pinyin_table = os.environ.get('CHA_PINYIN_TABLE')
+    if pinyin_table:
+      pinyin_cache.Load(pinyin_table)
+    Watcher(args[2] if len(args) > 2 and not args[2].startswith('-') else '.',
+            tokenizer=TokenizerOption(args)).Run()
+    if pinyin_table:
+      pinyin_cache.Save(pinyin_table)
+    exit(0)
+
   source_file = args[1]
+  profile = Profile() if '--profile' in args else None
+  if source_file == '-':
+    parser = ChaParser(tokenizer=TokenizerOption(args),
+                       convert_imports=False)
+    if profile:
+      profile.Attach(parser)
+    sys.stdout.writelines(parser.TranslateLines(sys.stdin, header=True))
+    if profile:
+      print(profile.Summary(), file=sys.stderr)
+    exit(0)
+
   if not source_file.endswith('.cha'):
     raise Exception('Must end with .cha')
 
@@ -319,5 +677,24 @@ if __name__ == '__main__':
   directory = '/'.join(source_file.split('/')[:-1])
   if directory: directory += '/'
 
-  parser = ChaParser(directory)
+  pinyin_table = os.environ.get('CHA_PINYIN_TABLE')
+  if pinyin_table:
+    pinyin_cache.Load(pinyin_table)
+
+  manifest = BuildManifest(os.path.join(directory, MANIFEST_NAME))
+  identifiers = IdentifierTable(os.path.join(directory, IDENTIFIERS_NAME), CHAR_TO_VAR_BASE)
+  parser = ChaParser(directory,
+                     tokenizer=TokenizerOption(args),
+                     interactive='-y' not in args,
+                     manifest=manifest,
+                     identifiers=identifiers,
+                     update_all='-u' in args)
+  if profile:
+    profile.Attach(parser)
   parser.Convert(source_file, dest_file)
+  manifest.Save()
+  if profile:
+    print(profile.Summary(), file=sys.stderr)
+
+  if pinyin_table:
+    pinyin_cache.Save(pinyin_table)
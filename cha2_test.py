@@ -1,9 +1,16 @@
 # Initial test setup for cha2.py
 
+import contextlib
+import io
+import os
+import tempfile
+import time
 import unittest
 
-from cha2 import ChaParser
-from cha_token import Token, WhitespaceToken, SymbolToken
+from cha2 import ChaParser, ChaParseException, ShouldOverride
+from dfa import DfaException
+from cha_token import Token, WhitespaceToken, SymbolToken, ReservedWordToken
+from cha_translation import TextNeedsSpace, spacing_kinds, spacing_table, PLAIN, MatchBeginningWord
 
 class TestParseLine(unittest.TestCase):
   """Tests the ParseLine function in ChaParser."""
@@ -21,6 +28,17 @@ class TestParseLine(unittest.TestCase):
     output = self.ParseLine(source_line)
     self.assertEqual(expected_output, output)
 
+  def testRejectsMalformedNary(self):
+    for line in ('我是三进人', '我是三进', '我是三进一点', '我是二进'):
+      self.assertRaises(DfaException, self.ParseLine, line)
+
+  def testSupportsBase36(self):
+    self.case('我是三六进ZZ', 'wǒ = 1295')
+
+  def testRejectsBasesOutsideRange(self):
+    for line in ('我是三七进一', '我是零进一'):
+      self.assertRaises(DfaException, self.ParseLine, line)
+
   def MultilineCase(self, source, expected):
     lines = [self.ParseLine(l) for l in source.split('\n')]
     self.assertEqual(expected, '\n'.join(lines))
@@ -121,3 +139,237 @@ class TestSymbolsReplaceTokens(unittest.TestCase):
     self.case(
         [WhitespaceToken(''), '啊', '加', '是',          '一'],
         [WhitespaceToken(''), '啊', SymbolToken('加是'), '一'])
+
+  def testSwapsLongestSymbol(self):
+    self.case(
+        [WhitespaceToken(''), '啊',            '整', '除', '等', '于', '一'],
+        [WhitespaceToken(''), '啊', SymbolToken('整除等于'),           '一'])
+
+  def testSwapsLeftmostSymbolFirst(self):
+    self.case(
+        [WhitespaceToken(''), '啊',            '不', '是',           '不', '是', '一'],
+        [WhitespaceToken(''), '啊', SymbolToken('不是'), SymbolToken('不是'), '一'])
+
+class TestTokenizeFused(unittest.TestCase):
+  """Compares TokenizeFused with the reference TokenizePipeline."""
+  TOKENIZER = 'fused'
+
+  def setUp(self):
+    self.reference = ChaParser()
+    self.parser = ChaParser(tokenizer=self.TOKENIZER)
+
+  def case(self, *lines):
+    for line in lines:
+      self.assertEqual(
+          self.reference.TokenizePipeline(line), self.parser.Tokenize(line), line)
+      self.assertEqual(
+          self.reference.multiline_string_dfa.inside,
+          self.parser.multiline_string_dfa.inside)
+
+  def testExampleFile(self):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin', 'example.cha')
+    with open(path, 'r') as f:
+      self.case(*f.readlines())
+
+  def testNumbersAndVariables(self):
+    self.case('第一是一', '我是三十三万五千加二进一零一', '朝们是【超，抄，钞】')
+
+  def testBeginningWordsAndWhitespace(self):
+    self.case('种类人：', ' \t定义 走（自己）：\n', '  ', '')
+
+  def testStringsAndComments(self):
+    self.case(
+        '打印（“我是”加“#不是”）#注释“北”',
+        '我是“\\”” #',
+        '#“““')
+
+  def testMultilineStrings(self):
+    self.case('我是“““一', '二\\”””', '三”””加“四”', '“““五”””是六')
+
+  def testUnevenQuotes_BothRaise(self):
+    for line in ('我是“不好', '“#“““'):
+      self.assertRaises(DfaException, ChaParser().TokenizePipeline, line)
+      self.assertRaises(DfaException, ChaParser(tokenizer=self.TOKENIZER).Tokenize, line)
+
+class TestTokenizeRegex(TestTokenizeFused):
+  """Compares TokenizeRegex with the reference TokenizePipeline."""
+  TOKENIZER = 'regex'
+
+  def testWhitespaceInsideSymbolsAndWords(self):
+    self.case('甲大 于乙', '否 则如果甲是 不是乙：', '\n定义甲', '我 们是一 二')
+
+  def testStringErrorsBeforeNumberErrors(self):
+    line = '一一二进进我“E过（'
+    self.assertRaises(DfaException, ChaParser().TokenizePipeline, line)
+    self.assertRaises(DfaException, ChaParser(tokenizer='regex').Tokenize, line)
+
+class TestPrefilter(unittest.TestCase):
+  def testSkipsStringAutomataWithoutQuotes(self):
+    parser = ChaParser(convert_imports=False)
+    stages = []
+    parser.AddStageCallback(lambda name, seconds, result: stages.append(name))
+    parser.ParseLine('我是一 #注释\n')
+    self.assertNotIn('string_dfa', stages)
+    parser.ParseLine('我是“一”\n')
+    self.assertIn('string_dfa', stages)
+
+  def testKeepsMultilineStrings(self):
+    parser = ChaParser(convert_imports=False)
+    parser.ParseLine('我是“““\n')
+    self.assertEqual('一', parser.ParseLine('一\n'))
+    self.assertTrue(parser.multiline_string_dfa.inside)
+
+  def testOnlyLooksForImportsWithImportWords(self):
+    parser = ChaParser(interactive=False)
+    stages = []
+    parser.AddStageCallback(lambda name, seconds, result: stages.append(name))
+    parser.ParseLine('我是一\n')
+    self.assertNotIn('imports', stages)
+    self.assertRaises(ChaParseException, parser.ParseLine, '引进不存在\n')
+
+  def testLooksForSpacedOutImports(self):
+    parser = ChaParser(interactive=False)
+    for _ in range(2):
+      self.assertRaises(ChaParseException, parser.ParseLine, '引 进不存在\n')
+
+class TestLineCache(unittest.TestCase):
+  def setUp(self):
+    self.parser = ChaParser(convert_imports=False)
+
+  def testRemembersLines(self):
+    self.assertEqual('wǒ = 1', self.parser.ParseLine('我是一\n'))
+    self.assertEqual('wǒ = 1', self.parser.ParseLine('我是一\n'))
+    self.assertEqual((1, 1), (self.parser.line_hits, self.parser.line_misses))
+
+  def testReplaysVariableNames(self):
+    self.parser.ParseLine('我是一\n')
+    self.parser.Reset()
+    self.assertEqual('wǒ = 1', self.parser.ParseLine('我是一\n'))
+    self.assertEqual('wǒ', self.parser.char_to_var['我'])
+    self.assertEqual('我', self.parser.var_to_char['wǒ'])
+    self.assertEqual(1, self.parser.line_hits)
+
+  def testTranslatesAgainWhenNamesDiffer(self):
+    self.parser.ParseLine('他是一\n')
+    self.assertEqual('tā1 = 2', self.parser.ParseLine('它是二\n'))
+    self.parser.Reset()
+    self.assertEqual('tā = 2', self.parser.ParseLine('它是二\n'))
+    self.assertEqual(0, self.parser.line_hits)
+
+  def testKeysOnMultilineState(self):
+    opening = self.parser.ParseLine('我是“““一\n')
+    self.assertNotEqual(opening, self.parser.ParseLine('我是“““一\n'))
+    self.parser.ResetLineState()
+    self.assertEqual(opening, self.parser.ParseLine('我是“““一\n'))
+    self.assertTrue(self.parser.multiline_string_dfa.inside)
+    self.assertEqual(1, self.parser.line_hits)
+
+  def testSkipsImportsWhenConverting(self):
+    parser = ChaParser(interactive=False)
+    self.assertRaises(ChaParseException, parser.ParseLine, '引进不存在\n')
+
+  def testLooksForSpacedOutImports(self):
+    parser = ChaParser(interactive=False)
+    for _ in range(2):
+      self.assertRaises(ChaParseException, parser.ParseLine, '引 进不存在\n')
+    self.assertRaises(ChaParseException, parser.ParseLine, '引进不存在\n')
+
+  def testLooksForSpacedOutImports(self):
+    parser = ChaParser(interactive=False)
+    for _ in range(2):
+      self.assertRaises(ChaParseException, parser.ParseLine, '引 进不存在\n')
+
+  def testIsBounded(self):
+    self.parser.line_cache_size = 2
+    for line in ('我是一\n', '我是二\n', '我是三\n'):
+      self.parser.ParseLine(line)
+    self.assertEqual([('我是二\n', False), ('我是三\n', False)], list(self.parser.line_cache))
+
+class TestShouldOverride(unittest.TestCase):
+  class UpToDateManifest(object):
+    def IsUpToDate(self, source, dest):
+      return True
+
+  def testSkipsUpToDateFiles(self):
+    with contextlib.redirect_stdout(io.StringIO()):
+      self.assertFalse(ShouldOverride('a.cha', 'a.py', False, self.UpToDateManifest()))
+
+  def testUpdatesAllFiles(self):
+    self.assertTrue(ShouldOverride('a.cha', 'a.py', False, self.UpToDateManifest(), update_all=True))
+
+  def Write(self, name, modified):
+    path = os.path.join(self.directory.name, name)
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write('我是一\n')
+    os.utime(path, (modified, modified))
+    return path
+
+  def testComparesTimesWithoutManifest(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.addCleanup(self.directory.cleanup)
+    future = time.time() + 1000
+    source = self.Write('a.cha', future)
+    dest = self.Write('a.py', future + 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+      # Up to date files are skipped without asking, even when interactive.
+      self.assertFalse(ShouldOverride(source, dest))
+    os.utime(source, (future + 2, future + 2))
+    self.assertTrue(ShouldOverride(source, dest, interactive=False))
+
+class TestTranslateLines(unittest.TestCase):
+  def setUp(self):
+    self.parser = ChaParser()
+
+  def testTranslatesStream(self):
+    stream = io.StringIO('我是一\n#注释\n种类人：\n')
+    self.assertEqual(
+        ['wǒ = 1\n', '#注释\n', 'class rén(ChaObject):\n'],
+        list(self.parser.TranslateLines(stream)))
+
+  def testAddsHeader(self):
+    self.assertEqual(
+        ['from cha_base import *\n', 'wǒ = 1\n'],
+        list(self.parser.TranslateLines(['我是一'], header=True)))
+
+  def testKeepsMultilineStringsAcrossLines(self):
+    self.assertEqual(
+        ['wǒ = """一\n', '二\n', '"""\n'],
+        list(self.parser.TranslateLines(['我是“““一\n', '二\n', '”””\n'])))
+
+  def testReadsLazily(self):
+    def Lines():
+      yield '我是一\n'
+      raise AssertionError('Read too far')
+    self.assertEqual('wǒ = 1\n', next(self.parser.TranslateLines(Lines())))
+
+class TestSpacing(unittest.TestCase):
+  def testTableMatchesTextRule(self):
+    texts = ['wǒ', '1', '=', 'else', ':', ',', '(', 'import', 'is not', '']
+    for l in texts:
+      for r in texts:
+        self.assertEqual(
+            TextNeedsSpace(l, r),
+            spacing_table[spacing_kinds.get(l, PLAIN)][spacing_kinds.get(r, PLAIN)],
+            (l, r))
+
+  def testJoinsLine(self):
+    parser = ChaParser()
+    self.assertEqual('else:', parser.ParseLine('否则：'))
+    self.assertEqual('wǒ = (1, 2)  #好', parser.ParseLine('我是（一，二）#好'))
+    self.assertEqual('  #好', parser.ParseLine(' #好'))
+
+class TestReservedWordsReplaceTokens(unittest.TestCase):
+  def testMatchesLongestWordWithSpan(self):
+    self.assertEqual(('否则如果', 4), MatchBeginningWord('否则如果我：'))
+    self.assertEqual(('定义', 3), MatchBeginningWord(['我', *'定义我'], 1))
+    self.assertIsNone(MatchBeginningWord('我是一'))
+    self.assertIsNone(MatchBeginningWord(''))
+
+  def testReplacesBeginningOnly(self):
+    space, end = WhitespaceToken(''), Token('')
+    self.assertEqual(
+        [space, ReservedWordToken('定义'), *'我定义', end],
+        ChaParser().ReservedWordsReplaceTokens([space, *'定义我定义', end]))
+    self.assertEqual(
+        [space, *'我定义', end],
+        ChaParser().ReservedWordsReplaceTokens([space, *'我定义', end]))
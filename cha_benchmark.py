@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+
+"""Measures how fast .cha is translated, using a generated corpus.
+
+Each stage of ChaParser.TokenizePipeline is timed on its own, followed by
+each whole tokenizer, ParseLine and Convert. How long a new process takes to
+import cha2 and translate its first line is timed too. Results are added to
+a JSON file keyed by git commit, so runs on different commits can be compared.
+"""
+
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cha2 import ChaParser, TOKENIZERS
+
+# Run in a new interpreter by MeasureStartup, printing the seconds taken to
+# import cha2 and then to translate a first line.
+_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import cha2
+imported = time.perf_counter()
+cha2.ChaParser(convert_imports=False).ParseLine('甲是一\\n')
+print(imported - start, time.perf_counter() - imported)
+"""
+
+# Characters for generated names, none of which are symbols or reserved words.
+NAME_CHARS = '人山水火木金土日月星天地风云雨花草鸟鱼马牛羊猫狗书车路门窗桌椅'
+ARABIC_NUMBERS = ('零', '一', '二三', '四五六', '七点八', '三E五', '九九九')
+FULLNAME_NUMBERS = ('十', '十三', '三十三万五千', '五千五百二十', '一万')
+
+class CorpusGenerator(object):
+  """Generates .cha code resembling bin/example.cha."""
+  def __init__(self, seed=0):
+    self.random = random.Random(seed)
+
+  def Name(self):
+    return ''.join(self.random.choice(NAME_CHARS) for _ in range(self.random.randint(1, 3)))
+
+  def Number(self):
+    return self.random.choice(ARABIC_NUMBERS + FULLNAME_NUMBERS)
+
+  def Expression(self):
+    choice = self.random.randint(0, 4)
+    if choice == 0:
+      return '自己的%s加%s' % (self.Name(), self.Number())
+    elif choice == 1:
+      return '“%s”加字（%s）' % (self.Name(), self.Name())
+    elif choice == 2:
+      return '【%s、%s、%s】' % (self.Name(), self.Number(), self.Name())
+    elif choice == 3:
+      return '%s的%s（%s，%s）' % (self.Name(), self.Name(), self.Number(), self.Name())
+    return self.Number()
+
+  def Method(self, indent):
+    inner = indent + ' '
+    body = inner + ' '
+    lines = [
+      '%s定义%s（自己、%s）：' % (inner, self.Name(), self.Name()),
+      '%s“““%s。' % (body, self.Name()),
+      '',
+      '%s价值：%s，%s。' % (body, self.Name(), self.Name()),
+      '%s”””' % body,
+    ]
+    for _ in range(self.random.randint(2, 6)):
+      choice = self.random.randint(0, 4)
+      if choice == 0:
+        lines.append('%s如果%s大于%s：#%s' % (body, self.Name(), self.Number(), self.Name()))
+        lines.append('%s 自己的%s加等于%s' % (body, self.Name(), self.Expression()))
+        lines.append('%s否则：' % body)
+        lines.append('%s 过' % body)
+      elif choice == 1:
+        lines.append('%s打印（%s）' % (body, self.Expression()))
+      elif choice == 2:
+        lines.append('%s自己的%s是%s' % (body, self.Name(), self.Expression()))
+      else:
+        lines.append('%s%s是%s' % (body, self.Name(), self.Expression()))
+    lines.append('%s退还 自己' % body)
+    lines.append('')
+    return lines
+
+  def Class(self):
+    lines = [
+      '种类%s（%s）：' % (self.Name(), self.Name()),
+      ' 定义艹艹初始艹艹（自己）：',
+    ]
+    for _ in range(self.random.randint(1, 4)):
+      lines.append('  自己的%s是%s' % (self.Name(), self.Number()))
+    lines.append('')
+    for _ in range(self.random.randint(1, 3)):
+      lines.extend(self.Method(''))
+    return lines
+
+  def Lines(self, count):
+    """Returns at least count lines of .cha, each ending with a newline."""
+    lines = ['从time引进time为时间', '']
+    while len(lines) < count:
+      lines.extend(self.Class())
+    return [line + '\n' for line in lines[:count]]
+
+def Measure(fn):
+  """Runs fn twice, once for time and once under tracemalloc for peak memory.
+
+  Returns:
+    (any, number, number) The result of the timed run, the seconds it took
+    and the peak memory in bytes.
+  """
+  start = time.perf_counter()
+  result = fn()
+  seconds = time.perf_counter() - start
+  tracemalloc.start()
+  fn()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return result, seconds, peak
+
+def TokenizeStages(parser):
+  """The stages of ChaParser.TokenizePipeline, in order, as (name, fn) pairs."""
+  def Multiline(tokens):
+    return parser.multiline_string_dfa.ReplaceTokens(
+        tokens, parser.multiline_string_dfa.inside)
+  return [
+    ('characters', lambda line: [c for c in line]),
+    ('multiline_string_dfa', Multiline),
+    ('string_dfa', parser.string_dfa.ReplaceTokens),
+    ('whitespace', parser.WhitespaceReplaceTokens),
+    ('reserved_words', parser.ReservedWordsReplaceTokens),
+    ('symbols', parser.SymbolsReplaceTokens),
+    ('number_variable_dfa', parser.number_variable_dfa.ReplaceTokens),
+  ]
+
+def RunBenchmark(line_count=10000, seed=0):
+  """Times each stage of translating a generated corpus.
+
+  Args:
+    line_count: Optional[number] How many lines to generate.
+    seed: Optional[number] Seed for the generated corpus.
+  Returns:
+    dict The results of each stage, with seconds, lines per second and peak
+    memory in KiB.
+  """
+  lines = CorpusGenerator(seed).Lines(line_count)
+  results = {}
+
+  def Record(name, fn):
+    result, seconds, peak = Measure(fn)
+    results[name] = {
+      'seconds': seconds,
+      'lines_per_sec': len(lines) / seconds if seconds else float('inf'),
+      'peak_kib': peak / 1024,
+    }
+    return result
+
+  # Each stage runs over every line before the next, so none are mixed.
+  stage_input = lines
+  for name, stage in TokenizeStages(ChaParser(convert_imports=False)):
+    def RunStage():
+      return [stage(tokens) for tokens in stage_input]
+    stage_input = Record('tokenize.' + name, RunStage)
+
+  for tokenizer in TOKENIZERS:
+    def RunTokenize():
+      parser = ChaParser(tokenizer=tokenizer, convert_imports=False)
+      return [parser.Tokenize(line) for line in lines]
+    Record('tokenize.%s' % tokenizer, RunTokenize)
+
+    def RunParseLine():
+      parser = ChaParser(tokenizer=tokenizer, convert_imports=False)
+      return [parser.ParseLine(line) for line in lines]
+    Record('parse_line.%s' % tokenizer, RunParseLine)
+
+  directory = tempfile.mkdtemp()
+  source = os.path.join(directory, 'benchmark.cha')
+  dest = os.path.join(directory, 'benchmark.py')
+  with open(source, 'w') as f:
+    f.writelines(lines)
+  def RunConvert():
+    parser = ChaParser(directory + '/', interactive=False, convert_imports=False)
+    # Measure runs this twice, and the second would find dest up to date.
+    parser.Convert(source, dest, update=True)
+  stdout = sys.stdout
+  sys.stdout = open(os.devnull, 'w')
+  try:
+    Record('convert', RunConvert)
+  finally:
+    sys.stdout.close()
+    sys.stdout = stdout
+    os.remove(source)
+    os.remove(dest)
+    os.rmdir(directory)
+  return results
+
+def MeasureStartup(runs=5):
+  """Times importing cha2 and translating a first line, each run in a new process.
+
+  Short runs of cha2.py pay for importing everything before translating
+  anything, which the other stages, timed in an already warm process, do not
+  show.
+
+  Args:
+    runs: Optional[number] How many processes to start, the fastest is kept.
+  Returns:
+    dict The seconds taken by 'import' and by 'first_line'.
+  """
+  directory = os.path.dirname(os.path.abspath(__file__))
+  results = {}
+  for _ in range(runs):
+    output = subprocess.check_output([sys.executable, '-c', _STARTUP_SCRIPT], cwd=directory)
+    for name, seconds in zip(('import', 'first_line'), output.split()):
+      results[name] = min(float(seconds), results.get(name, float('inf')))
+  return results
+
+def CurrentCommit():
+  """Returns the git commit of this directory, or 'unknown'."""
+  try:
+    return subprocess.check_output(
+        ['git', 'rev-parse', '--short', 'HEAD'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stderr=subprocess.DEVNULL).decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return 'unknown'
+
+def SaveResults(path, results, line_count, seed, startup=None):
+  """Adds a run to the results file, replacing an earlier run of the same commit."""
+  runs = []
+  if os.path.isfile(path):
+    with open(path, 'r') as f:
+      runs = json.load(f)
+  run = {
+    'commit': CurrentCommit(),
+    'date': datetime.datetime.now().isoformat(timespec='seconds'),
+    'python': platform.python_version(),
+    'lines': line_count,
+    'seed': seed,
+    'stages': results,
+  }
+  if startup is not None:
+    run['startup'] = startup
+  runs = [r for r in runs if r['commit'] != run['commit'] or run['commit'] == 'unknown']
+  runs.append(run)
+  with open(path, 'w') as f:
+    json.dump(runs, f, indent=1)
+  return runs
+
+def PrintResults(runs):
+  """Prints the latest run, compared with the one before it if there is one."""
+  latest = runs[-1]
+  previous = runs[-2] if len(runs) > 1 else None
+  print('Commit %s, %d lines' % (latest['commit'], latest['lines']))
+  if previous:
+    print('Compared with %s' % previous['commit'])
+  for name, stage in latest['stages'].items():
+    line = '%-32s %12.0f lines/sec %10.1f KiB' % (name, stage['lines_per_sec'], stage['peak_kib'])
+    if previous and name in previous['stages']:
+      line += '  x%.2f' % (stage['lines_per_sec'] / previous['stages'][name]['lines_per_sec'])
+    print(line)
+  for name, seconds in latest.get('startup', {}).items():
+    line = '%-32s %12.1f ms' % ('startup.' + name, seconds * 1000)
+    if previous and name in previous.get('startup', {}):
+      line += '  x%.2f' % (previous['startup'][name] / seconds)
+    print(line)
+
+def help_command():
+  print("""Benchmarks translating a generated .cha corpus
+
+To use:
+$> cha_benchmark.py [-n LINES] [-s SEED] [-o RESULTS_FILE]
+
+Optionals:
+  -n  How many lines to generate, defaults to 10000.
+  -s  Seed for the corpus, defaults to 0.
+  -o  The JSON file to add the results to, defaults to bench_results.json.
+  -c  Write the corpus to stdout instead of benchmarking.
+""")
+
+if __name__ == '__main__':
+  args = sys.argv
+  if '-h' in args:
+    help_command()
+    exit(0)
+  line_count = int(args[args.index('-n') + 1]) if '-n' in args else 10000
+  seed = int(args[args.index('-s') + 1]) if '-s' in args else 0
+  path = args[args.index('-o') + 1] if '-o' in args else 'bench_results.json'
+  if '-c' in args:
+    sys.stdout.writelines(CorpusGenerator(seed).Lines(line_count))
+    exit(0)
+  results = RunBenchmark(line_count, seed)
+  PrintResults(SaveResults(path, results, line_count, seed, MeasureStartup()))
@@ -0,0 +1,34 @@
+"""Tests cha_benchmark.py."""
+
+import unittest
+
+from cha2 import ChaParser
+from cha_benchmark import CorpusGenerator, MeasureStartup, RunBenchmark
+
+class CorpusGeneratorTest(unittest.TestCase):
+  def testIsDeterministic(self):
+    self.assertEqual(CorpusGenerator(3).Lines(200), CorpusGenerator(3).Lines(200))
+
+  def testGeneratesTranslatableCode(self):
+    lines = CorpusGenerator(5).Lines(500)
+    self.assertEqual(500, len(lines))
+    parser = ChaParser(convert_imports=False)
+    python = ''.join(parser.TranslateLines(lines))
+    compile(python, 'corpus', 'exec')
+
+class RunBenchmarkTest(unittest.TestCase):
+  def testTimesEachStage(self):
+    results = RunBenchmark(50)
+    for name in ('tokenize.symbols', 'tokenize.number_variable_dfa', 'tokenize.fused',
+                 'parse_line.pipeline', 'convert'):
+      self.assertGreater(results[name]['lines_per_sec'], 0, name)
+      self.assertGreater(results[name]['peak_kib'], 0, name)
+
+  def testMeasuresRealConversions(self):
+    # A conversion of the whole corpus needs far more than an up to date check.
+    self.assertGreater(RunBenchmark(200)['convert']['peak_kib'], 100)
+
+  def testTimesStartup(self):
+    startup = MeasureStartup(runs=1)
+    self.assertGreater(startup['import'], 0)
+    self.assertGreater(startup['first_line'], 0)
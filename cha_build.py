@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+
+"""Converts every .cha file in a directory tree, in parallel."""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import io
+import os
+import sys
+
+from cha2 import ChaParser, CHAR_TO_VAR_BASE, VAR_TO_CHAR_BASE, TokenizerOption
+from cha_graph import ImportGraph
+from cha_identifiers import IdentifierTable, IDENTIFIERS_NAME
+from cha_manifest import BuildManifest, MANIFEST_NAME
+from cha_token import VariableToken
+
+def FindChaFiles(root):
+  """Finds all .cha files under root.
+
+  Args:
+    root: string The directory to search.
+  Returns:
+    Array[string] The paths of the files, sorted so builds are deterministic.
+  """
+  sources = []
+  for directory, dirs, files in os.walk(root):
+    dirs.sort()
+    for name in sorted(files):
+      if name.endswith('.cha'):
+        sources.append(os.path.join(directory, name))
+  return sources
+
+# IdentifierTable of each project, kept by each worker process between files.
+_identifier_tables = {}
+
+def ProjectIdentifiers(root):
+  """Returns the IdentifierTable of the project in root, reusing it if already open."""
+  path = os.path.join(root, IDENTIFIERS_NAME)
+  if path not in _identifier_tables:
+    _identifier_tables[path] = IdentifierTable(path, CHAR_TO_VAR_BASE)
+  return _identifier_tables[path]
+
+def DestinationFile(source, identifiers=None):
+  """Returns the .py file a .cha file is converted to.
+
+  The name is translated the same way as imports of the file are, so the
+  converted files can import each other.
+
+  Args:
+    source: string The .cha file.
+    identifiers: Optional[IdentifierTable] The names used by the project.
+  """
+  directory, name = os.path.split(source[:-4])
+  if identifiers is not None:
+    module = identifiers.Get(name)
+  else:
+    module = VariableToken(name).Translate(dict(CHAR_TO_VAR_BASE), dict(VAR_TO_CHAR_BASE))
+  return os.path.join(directory, module + '.py')
+
+def ConvertFile(source, project_files=(), tokenizer='pipeline', root=None):
+  """Converts a single file of a project, run inside a worker process.
+
+  Other files of the project are marked as already imported, so imports of
+  them are left to their own worker instead of being converted again.
+
+  Args:
+    source: string The .cha file to convert.
+    project_files: Iterable[string] All .cha files being converted.
+    tokenizer: Optional[string] Which tokenizer the parser uses.
+    root: Optional[string] The project directory, whose identifier table
+      names the variables. Each file names its own when not given.
+  Returns:
+    (string, string, string|None) The source, everything printed while
+    converting it, and the error message if the conversion failed.
+  """
+  directory = os.path.dirname(source)
+  identifiers = ProjectIdentifiers(root) if root is not None else None
+  parser = ChaParser(directory + '/' if directory else '',
+                     tokenizer=tokenizer,
+                     interactive=False,
+                     identifiers=identifiers)
+  parser.imported_files.update(f for f in project_files if f != source)
+  output = io.StringIO()
+  error = None
+  with redirect_stdout(output):
+    try:
+      # BuildProject already checked the manifest, so the file is out of date.
+      parser.Convert(source, DestinationFile(source, identifiers), update=True)
+    except Exception as e:
+      error = '%s: %s' % (type(e).__name__, e)
+  return source, output.getvalue(), error
+
+def BuildProject(root, jobs=None, tokenizer='pipeline', update_all=False):
+  """Converts the changed .cha files under root using a pool of processes.
+
+  Files are skipped when the manifest in root shows they are up to date.
+  Each converted file gets its own parser, and variables are named by the
+  identifier table in root, so a name never changes once given. Files are
+  handed to the workers in import order, imported files before the files
+  importing them, and logs are printed in that order.
+
+  Args:
+    root: string The directory to build.
+    jobs: Optional[number] How many processes to use, defaults to the number of cores.
+    tokenizer: Optional[string] Which tokenizer the parsers use.
+    update_all: Optional[bool] Whether to convert files even if up to date.
+  Returns:
+    Array[(string, string)] The source and error message of each failed file.
+  """
+  sources = FindChaFiles(root)
+  project_files = frozenset(sources)
+  manifest = BuildManifest(os.path.join(root, MANIFEST_NAME))
+  graph = ImportGraph.Scan(sources)
+  for cycle in graph.Cycles():
+    print('Import cycle between: ' + ', '.join(cycle))
+  identifiers = ProjectIdentifiers(root)
+  stale = []
+  for source in (s for wave in graph.Waves() for s in wave if s in project_files):
+    dest = DestinationFile(source, identifiers)
+    if not update_all and manifest.IsUpToDate(source, dest):
+      print('File up to date: ' + dest)
+    else:
+      stale.append(source)
+  failures = []
+  if stale:
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+      results = pool.map(ConvertFile,
+                         stale,
+                         [project_files] * len(stale),
+                         [tokenizer] * len(stale),
+                         [root] * len(stale))
+      for source, output, error in results:
+        print(output, end='')
+        if error:
+          print('Failed converting %s: %s' % (source, error))
+          failures.append((source, error))
+        else:
+          manifest.Record(source, DestinationFile(source, identifiers))
+  manifest.Save()
+  return failures
+
+def help_command():
+  print("""Converts all .cha files in a directory into .py files in parallel
+
+To use:
+$> cha_build.py DIRECTORY
+
+Optionals:
+  -j N  Number of processes to use, defaults to the number of cores.
+  -u    Update all files even if they are up to date.
+  -f    Use the single pass tokenizer.
+  -r    Use the regular expression tokenizer.
+""")
+
+if __name__ == '__main__':
+  args = sys.argv
+  if len(args) < 2:
+    help_command()
+    exit(0)
+
+  jobs = None
+  if '-j' in args:
+    jobs = int(args[args.index('-j') + 1])
+
+  failures = BuildProject(args[1], jobs,
+                          tokenizer=TokenizerOption(args),
+                          update_all='-u' in args)
+  exit(1 if failures else 0)
@@ -0,0 +1,77 @@
+"""Tests cha_build.py."""
+
+from contextlib import redirect_stdout
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from cha_build import FindChaFiles, DestinationFile, BuildProject
+
+BIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin')
+
+class BuildProjectTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    for name in ('example.cha', '人人.cha'):
+      shutil.copy(os.path.join(BIN, name), self.root)
+    os.mkdir(os.path.join(self.root, 'sub'))
+    shutil.copy(os.path.join(BIN, '人人.cha'), os.path.join(self.root, 'sub'))
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def testFindsFilesInOrder(self):
+    self.assertEqual(
+        [os.path.join(self.root, 'example.cha'),
+         os.path.join(self.root, '人人.cha'),
+         os.path.join(self.root, 'sub', '人人.cha')],
+        FindChaFiles(self.root))
+
+  def testTranslatesDestinationFile(self):
+    self.assertEqual(
+        os.path.join('sub', 'rénrén.py'), DestinationFile(os.path.join('sub', '人人.cha')))
+
+  def testConvertsAllFiles(self):
+    with redirect_stdout(io.StringIO()):
+      self.assertEqual([], BuildProject(self.root, jobs=2))
+    for path in ('example.py', 'rénrén.py', os.path.join('sub', 'rénrén.py')):
+      self.assertTrue(os.path.isfile(os.path.join(self.root, path)), path)
+
+  def testImportedFilesAreOnlyConvertedOnce(self):
+    output = io.StringIO()
+    with redirect_stdout(output):
+      BuildProject(self.root, jobs=2)
+    exported = os.path.join(self.root, 'rénrén.py')
+    self.assertEqual(1, output.getvalue().count('Exporting to %s\n' % exported))
+
+  def testReportsFailures(self):
+    with open(os.path.join(self.root, 'bad.cha'), 'w') as f:
+      f.write('我是“不好\n')
+    with redirect_stdout(io.StringIO()):
+      failures = BuildProject(self.root, jobs=2)
+    self.assertEqual([os.path.join(self.root, 'bad.cha')], [source for source, _ in failures])
+
+  def testSkipsUpToDateFiles(self):
+    with redirect_stdout(io.StringIO()):
+      BuildProject(self.root, jobs=2)
+    output = io.StringIO()
+    with redirect_stdout(output):
+      self.assertEqual([], BuildProject(self.root, jobs=2))
+    self.assertNotIn('Exporting', output.getvalue())
+    self.assertEqual(3, output.getvalue().count('File up to date'))
+
+  def testNamesIdentifiersTheSameInEveryFile(self):
+    for name, text in (('甲.cha', '他是一\n它是二\n'), ('乙.cha', '它是一\n他是二\n')):
+      with open(os.path.join(self.root, name), 'w', encoding='utf-8') as f:
+        f.write(text)
+    with redirect_stdout(io.StringIO()):
+      self.assertEqual([], BuildProject(self.root, jobs=2))
+    with open(os.path.join(self.root, 'jiǎ.py'), encoding='utf-8') as f:
+      first = f.read().splitlines()[1:]
+    with open(os.path.join(self.root, 'yǐ.py'), encoding='utf-8') as f:
+      second = f.read().splitlines()[1:]
+    he, it = first[0].split(' = ')[0], first[1].split(' = ')[0]
+    self.assertEqual({'tā', 'tā1'}, {he, it})
+    self.assertEqual([it + ' = 1', he + ' = 2'], second)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Sends .cha files to cha_server.py for translation.
+
+Only uses the standard library, so it starts quickly.
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+
+def DefaultSocket():
+  """Returns where the server listens by default.
+
+  The user's runtime directory is private to them, so other users cannot
+  take the path first. Without one, a per user name in the temp directory
+  is used.
+  """
+  runtime_directory = os.environ.get('XDG_RUNTIME_DIR')
+  if runtime_directory:
+    return os.path.join(runtime_directory, 'cha.sock')
+  return os.path.join(tempfile.gettempdir(), 'cha-%d.sock' % os.getuid())
+
+DEFAULT_SOCKET = DefaultSocket()
+
+class ChaClient(object):
+  """A connection to a running cha_server.py."""
+  def __init__(self, socket_path=DEFAULT_SOCKET):
+    self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self.socket.connect(socket_path)
+    self.file = self.socket.makefile('rwb')
+
+  def Translate(self, source, tokenizer='pipeline', directory=''):
+    """Translates .cha text.
+
+    Args:
+      source: string The .cha text.
+      tokenizer: Optional[string] Which tokenizer to use.
+      directory: Optional[string] The directory of the file.
+    Returns:
+      dict With 'python', the translated text or None on failure, and
+      'diagnostics', a list of errors.
+    """
+    return self.Send({'source': source, 'tokenizer': tokenizer, 'directory': directory})
+
+  def Open(self, document, source, tokenizer='pipeline', directory=''):
+    """Opens a document on the server, replacing it if already open.
+
+    Args:
+      document: string The name of the document, such as its path.
+      source: string The .cha text.
+      tokenizer: Optional[string] Which tokenizer to use.
+      directory: Optional[string] The directory of the file.
+    Returns:
+      dict The same as Translate.
+    """
+    return self.Send({'document': document, 'source': source,
+                      'tokenizer': tokenizer, 'directory': directory})
+
+  def Edit(self, document, edits):
+    """Changes an open document, only translating the lines affected again.
+
+    Args:
+      document: string The name given to Open.
+      edits: Array[((number, number), (number, number), string)] The start
+        and end line and column of each replaced part, and the text for it.
+    Returns:
+      dict The same as Translate, for the whole document.
+    """
+    return self.Send({'document': document, 'edits': [
+        {'start': start, 'end': end, 'text': text} for start, end, text in edits]})
+
+  def CloseDocument(self, document):
+    """Forgets a document opened with Open."""
+    self.Send({'document': document, 'close': True})
+
+  def Send(self, request):
+    """Sends a request and waits for the response."""
+    self.file.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+    self.file.flush()
+    return json.loads(self.file.readline().decode('utf-8'))
+
+  def Close(self):
+    self.file.close()
+    self.socket.close()
+
+def help_command():
+  print("""Translates a .cha file using a running cha_server.py
+
+To use:
+$> cha_client.py FILE_TO_TRANSLATE [SOCKET]
+
+Prints the .py code, and any errors to stderr.
+""")
+
+if __name__ == '__main__':
+  args = sys.argv
+  if len(args) < 2:
+    help_command()
+    exit(0)
+  with open(args[1], 'r', encoding='utf-8') as f:
+    source = f.read()
+  client = ChaClient(args[2] if len(args) > 2 else DEFAULT_SOCKET)
+  response = client.Translate(source, directory=os.path.dirname(args[1]))
+  client.Close()
+  for diagnostic in response['diagnostics']:
+    print('%s:%d: %s: %s' % (args[1], diagnostic['line'], diagnostic['type'], diagnostic['message']),
+          file=sys.stderr)
+  if response['python'] is None:
+    exit(1)
+  sys.stdout.write(response['python'])
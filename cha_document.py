@@ -0,0 +1,132 @@
+"""A .cha buffer that stays translated while an editor changes it."""
+
+from cha2 import ChaParser
+
+class Document(object):
+  """The lines of a .cha buffer together with the translation of each line.
+
+  Lines only depend on earlier lines through whether they start inside a
+  multiline string, and through the names given to variables. An edit is
+  translated from its first line until a line after it starts in the same
+  multiline state as before the edit, so the cost of an edit does not grow
+  with the size of the buffer.
+
+  Names given to variables are kept between edits, so a variable keeps its
+  name while the buffer is changed.
+
+  e.g.
+  document = Document('我是一\\n你是二\\n')
+  document.Edit((1, 0), (1, 1), '他')
+  document.Python()
+    => 'wǒ = 1\\ntā = 2\\n'
+  """
+  def __init__(self, text='', tokenizer='pipeline', parser=None):
+    self.parser = parser or ChaParser(tokenizer=tokenizer, convert_imports=False)
+    # Each line of .cha, with its newline.
+    self.lines = []
+    # Whether each line starts inside a multiline string, and the last ends inside one.
+    self.starts_inside = [False]
+    # The .py translation of each line, None where it failed.
+    self.python = []
+    # The type and message of the error of each line, None where it succeeded.
+    self.errors = []
+    self.Edit((0, 0), (0, 0), text)
+
+  def Edit(self, start, end, text):
+    """Replaces part of the buffer with text, and translates the changed lines.
+
+    Args:
+      start: (number, number) The line and column where the replaced text starts.
+      end: (number, number) The line and column just after the replaced text.
+      text: string The text to put in its place.
+    Raises:
+      ValueError: If start or end is not in the buffer, or end is before start.
+    Returns:
+      (number, number) The first line translated and the line after the last
+      one translated, in the new buffer.
+    """
+    (start_line, start_column), (end_line, end_column) = start, end
+    self.CheckPosition(start)
+    self.CheckPosition(end)
+    if start > end:
+      raise ValueError('Edit ends at %s before it starts at %s' % (end, start))
+    before = self.lines[start_line][:start_column] if start_line < len(self.lines) else ''
+    after = self.lines[end_line][end_column:] if end_line < len(self.lines) else ''
+    new_lines = (before + text + after).splitlines(True)
+    # Lines without a newline only stay the last line when nothing follows them.
+    old_end = min(end_line + 1, len(self.lines))
+    if new_lines and not new_lines[-1].endswith('\n') and old_end < len(self.lines):
+      new_lines[-1] += self.lines[old_end]
+      old_end += 1
+
+    inside = self.starts_inside[start_line]
+    changed = len(new_lines)
+    self.lines[start_line:old_end] = new_lines
+    self.starts_inside[start_line:old_end] = [None] * changed
+    self.python[start_line:old_end] = [None] * changed
+    self.errors[start_line:old_end] = [None] * changed
+
+    line = start_line
+    while line < len(self.lines):
+      if line >= start_line + changed and self.starts_inside[line] == inside:
+        break
+      self.starts_inside[line] = inside
+      inside = self.TranslateLine(line, inside)
+      line += 1
+    else:
+      self.starts_inside[line] = inside
+    return start_line, line
+
+  def CheckPosition(self, position):
+    """Raises ValueError unless position is a line and column in the buffer.
+
+    The end of the buffer is the column after the last character of the last
+    line, or column 0 of the line after it.
+    """
+    line, column = position
+    if not isinstance(line, int) or not isinstance(column, int):
+      raise ValueError('Position must be two numbers: %s' % (position,))
+    length = len(self.lines[line]) if 0 <= line < len(self.lines) else 0
+    if not (0 <= line <= len(self.lines) and 0 <= column <= length):
+      raise ValueError('Position %s is outside the document' % (position,))
+
+  def TranslateLine(self, line, inside):
+    """Translates a single line of the buffer.
+
+    A line which cannot be translated is recorded in errors, and is treated
+    as leaving the multiline state as it was.
+
+    Args:
+      line: number The index of the line.
+      inside: bool Whether the line starts inside a multiline string.
+    Returns:
+      bool Whether the next line starts inside a multiline string.
+    """
+    self.parser.ResetLineState(inside)
+    try:
+      python = self.parser.ParseLine(self.lines[line])
+    except Exception as e:
+      self.python[line] = None
+      self.errors[line] = {'type': type(e).__name__, 'message': str(e)}
+      return inside
+    self.python[line] = python if python.endswith('\n') else python + '\n'
+    self.errors[line] = None
+    return self.parser.multiline_string_dfa.inside
+
+  def Text(self):
+    """Returns the .cha text of the buffer."""
+    return ''.join(self.lines)
+
+  def Python(self):
+    """Returns the .py translation of the buffer, or None if any line failed."""
+    if any(self.errors):
+      return None
+    return ''.join(self.python)
+
+  def Diagnostics(self):
+    """Returns the error of each line that failed, in order.
+
+    Line numbers count from 1, and are those of the lines now, as lines may
+    have been added or removed above a line since it was translated.
+    """
+    return [dict(line=line + 1, **error) for line, error in enumerate(self.errors) if error]
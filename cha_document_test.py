@@ -0,0 +1,81 @@
+"""Tests cha_document.py."""
+
+import random
+import unittest
+
+from cha2 import ChaParser
+from cha_document import Document
+
+def FullTranslation(text):
+  return ''.join(ChaParser(convert_imports=False).TranslateLines(text.splitlines(True)))
+
+class DocumentTest(unittest.TestCase):
+  def testTranslates(self):
+    document = Document('种类人：\n 我是一\n')
+    self.assertEqual('class rén(ChaObject):\n  wǒ = 1\n', document.Python())
+    self.assertEqual([], document.Diagnostics())
+
+  def testEditsLine(self):
+    document = Document('我是一\n你是二\n他是三\n')
+    self.assertEqual((1, 2), document.Edit((1, 0), (1, 1), '它'))
+    self.assertEqual('我是一\n它是二\n他是三\n', document.Text())
+    # 他 was named first, so keeps its name.
+    self.assertEqual('wǒ = 1\ntā1 = 2\ntā = 3\n', document.Python())
+
+  def testInsertsAndDeletesLines(self):
+    document = Document('我是一\n你是二\n')
+    document.Edit((1, 0), (1, 0), '他是三\n它是四\n')
+    self.assertEqual('wǒ = 1\ntā = 3\ntā1 = 4\nnǐ = 2\n', document.Python())
+    document.Edit((0, 2), (2, 2), '')
+    self.assertEqual('我是四\n你是二\n', document.Text())
+    self.assertEqual('wǒ = 4\nnǐ = 2\n', document.Python())
+
+  def testStopsWhenMultilineStateMatches(self):
+    document = Document('我是一\n' * 1000)
+    self.assertEqual((500, 501), document.Edit((500, 2), (500, 3), '二'))
+
+  def testOpeningMultilineStringTranslatesFollowingLines(self):
+    document = Document('我是一\n你是二\n他是三\n')
+    self.assertEqual((0, 3), document.Edit((0, 2), (0, 3), '“““'))
+    self.assertEqual('wǒ = """\n你是二\n他是三\n', document.Python())
+    self.assertEqual((1, 3), document.Edit((1, 3), (1, 3), '”””'))
+    self.assertEqual('wǒ = """\n你是二"""\ntā = 3\n', document.Python())
+
+  def testReportsErrors(self):
+    document = Document('我是一\n我是“不好\n')
+    self.assertIsNone(document.Python())
+    self.assertEqual([2], [d['line'] for d in document.Diagnostics()])
+    document.Edit((1, 5), (1, 5), '”')
+    self.assertEqual('wǒ = 1\nwǒ = "不好"\n', document.Python())
+
+  def testNumbersErrorsByCurrentLine(self):
+    document = Document('我是一\n我是“不好\n')
+    document.Edit((0, 0), (0, 0), '你是二\n')
+    self.assertEqual([3], [d['line'] for d in document.Diagnostics()])
+    document.Edit((0, 0), (2, 0), '')
+    self.assertEqual([1], [d['line'] for d in document.Diagnostics()])
+
+  def testRejectsPositionsOutsideDocument(self):
+    document = Document('我是一\n')
+    for start, end in (((10, 0), (10, 0)), ((0, 9), (0, 9)), ((1, 1), (1, 1)),
+                       ((-1, 0), (0, 0)), ((0, 2), (0, 1)), (('0', 0), (0, 0))):
+      self.assertRaises(ValueError, document.Edit, start, end, '你')
+    self.assertEqual('我是一\n', document.Text())
+    document.Edit((1, 0), (1, 0), '你是二')
+    self.assertEqual('wǒ = 1\nnǐ = 2\n', document.Python())
+
+  def testMatchesFullTranslation(self):
+    random.seed(3)
+    pieces = ['我', '是', '一', '二', '加', '“', '”', '“““', '”””', '\n', ' ', '#', '种类', '：']
+    document = Document()
+    for _ in range(500):
+      text = document.Text()
+      start = random.randint(0, len(text))
+      end = random.randint(start, min(len(text), start + 5))
+      Position = lambda i: (text.count('\n', 0, i), i - text.rfind('\n', 0, i) - 1)
+      insert = ''.join(random.choice(pieces) for _ in range(random.randint(0, 4)))
+      document.Edit(Position(start), Position(end), insert)
+      text = text[:start] + insert + text[end:]
+      self.assertEqual(text, document.Text())
+      if document.Python() is not None:
+        self.assertEqual(FullTranslation(text), document.Python(), repr(text))
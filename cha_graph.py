@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+"""Finds which .cha files import each other, to convert them in dependency order."""
+
+import json
+import os
+import sys
+
+from cha2 import ChaParser, HasWord
+from cha_translation import PyToCha
+from dfa import DfaException
+
+# Every line importing a module has this word, including 从...引进 lines.
+IMPORT_WORDS = (PyToCha['import'],)
+
+def ScanImports(source, parser=None):
+  """Finds the .cha files a file imports, without converting it.
+
+  Only lines which contain the import word, even with whitespace between its
+  characters, and do not start inside a multiline string, are tokenized. Modules are found the same way
+  ChaParser.HandleImports finds them.
+
+  Args:
+    source: string The .cha file to scan.
+    parser: Optional[ChaParser] A parser to reuse, its state is reset.
+  Returns:
+    Array[string] The imported .cha files, in the order they are imported.
+  """
+  if parser is None:
+    parser = ChaParser(tokenizer='fused', convert_imports=False)
+  directory = os.path.dirname(source)
+  parser.Reset(directory + '/' if directory else '')
+  multiline = parser.multiline_string_dfa
+  imported = []
+  with open(source, 'r', encoding='utf-8') as f:
+    for line in f:
+      inside = multiline.inside
+      if not inside and HasWord(line, IMPORT_WORDS):
+        try:
+          tokens = parser.Tokenize(line)
+        except DfaException:
+          multiline.inside = False
+          continue
+        for module in parser.ImportedModules(tokens):
+          other_file = parser.cwd + module.GetValue() + '.cha'
+          if other_file not in imported:
+            imported.append(other_file)
+      elif inside or multiline.start_quote * 3 in line:
+        multiline.FindSpans(line, inside)
+  return imported
+
+class ImportGraph(object):
+  """The imports between .cha files.
+
+  e.g.
+  graph = ImportGraph.Scan(FindChaFiles('bin'))
+  graph.Waves()
+    => [['bin/人人.cha'], ['bin/example.cha']]
+  """
+  def __init__(self, imports=None):
+    # Maps each file to the files it imports.
+    self.imports = {}
+    for source, imported in (imports or {}).items():
+      self.SetImports(source, imported)
+
+  @classmethod
+  def Scan(cls, sources, parser=None):
+    """Builds the graph of the given files, keeping imports of files that exist.
+
+    Args:
+      sources: Iterable[string] The .cha files to scan.
+      parser: Optional[ChaParser] A parser to reuse for scanning.
+    """
+    if parser is None:
+      parser = ChaParser(tokenizer='fused', convert_imports=False)
+    graph = cls()
+    for source in sources:
+      graph.SetImports(source, ScanImports(source, parser))
+    return graph
+
+  def SetImports(self, source, imported):
+    """Replaces the files source imports. Files which do not exist are left out."""
+    self.imports[source] = sorted(f for f in set(imported) if os.path.isfile(f))
+    for f in self.imports[source]:
+      self.imports.setdefault(f, [])
+
+  def Remove(self, source):
+    """Removes a file, and the imports of it."""
+    self.imports.pop(source, None)
+    for imported in self.imports.values():
+      if source in imported:
+        imported.remove(source)
+
+  def Importers(self, sources):
+    """Returns sources together with every file which imports them, directly or not."""
+    imported_by = {}
+    for importer, imported in self.imports.items():
+      for source in imported:
+        imported_by.setdefault(source, set()).add(importer)
+    found = set(sources)
+    pending = list(sources)
+    while pending:
+      for importer in imported_by.get(pending.pop(), ()):
+        if importer not in found:
+          found.add(importer)
+          pending.append(importer)
+    return found
+
+  def Components(self):
+    """Groups files which import each other, directly or not.
+
+    Uses Tarjan's algorithm without recursion, so long import chains are fine.
+
+    Returns:
+      Array[Array[string]] Each group of files, sorted. A group comes after
+      every group its files import.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in sorted(self.imports):
+      if root in index:
+        continue
+      index[root] = low[root] = len(index)
+      stack.append(root)
+      on_stack.add(root)
+      work = [(root, iter(self.imports[root]))]
+      while work:
+        node, children = work[-1]
+        for child in children:
+          if child not in index:
+            index[child] = low[child] = len(index)
+            stack.append(child)
+            on_stack.add(child)
+            work.append((child, iter(self.imports[child])))
+            break
+          if child in on_stack:
+            low[node] = min(low[node], index[child])
+        else:
+          work.pop()
+          if work:
+            parent = work[-1][0]
+            low[parent] = min(low[parent], low[node])
+          if low[node] == index[node]:
+            component = []
+            while True:
+              member = stack.pop()
+              on_stack.discard(member)
+              component.append(member)
+              if member == node:
+                break
+            components.append(sorted(component))
+    return components
+
+  def Cycles(self):
+    """Returns each group of files which import each other, directly or not."""
+    return [c for c in self.Components()
+            if len(c) > 1 or c[0] in self.imports[c[0]]]
+
+  def Waves(self):
+    """Splits the files into waves, where each wave only imports earlier waves.
+
+    Files in the same wave can be converted at the same time. Files in a cycle
+    are put in the same wave.
+
+    Returns:
+      Array[Array[string]] The files of each wave, sorted.
+    """
+    wave_of = {}
+    waves = []
+    for component in self.Components():
+      members = set(component)
+      wave = 0
+      for source in component:
+        for imported in self.imports[source]:
+          if imported not in members:
+            wave = max(wave, wave_of[imported] + 1)
+      for source in component:
+        wave_of[source] = wave
+      if wave == len(waves):
+        waves.append([])
+      waves[wave].extend(component)
+    return [sorted(w) for w in waves]
+
+  def ToJson(self):
+    """Returns the graph, its waves and its cycles as a JSON string."""
+    return json.dumps({
+        'imports': self.imports,
+        'waves': self.Waves(),
+        'cycles': self.Cycles(),
+    }, ensure_ascii=False, indent=1, sort_keys=True)
+
+  def ToDot(self):
+    """Returns the graph in the Graphviz DOT language, files in a cycle in red."""
+    in_cycle = {source for cycle in self.Cycles() for source in cycle}
+    lines = ['digraph imports {']
+    for source in sorted(self.imports):
+      attributes = ' [color=red]' if source in in_cycle else ''
+      lines.append('  %s%s;' % (json.dumps(source, ensure_ascii=False), attributes))
+    for source in sorted(self.imports):
+      for imported in self.imports[source]:
+        lines.append('  %s -> %s;' % (json.dumps(source, ensure_ascii=False),
+                                      json.dumps(imported, ensure_ascii=False)))
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+def help_command():
+  print("""Prints which .cha files in a directory import each other, as JSON
+
+To use:
+$> cha_graph.py DIRECTORY
+
+Optionals:
+  --dot  Print the graph in the Graphviz DOT language instead.
+""")
+
+if __name__ == '__main__':
+  args = sys.argv
+  if len(args) < 2:
+    help_command()
+    exit(0)
+
+  from cha_build import FindChaFiles
+  graph = ImportGraph.Scan(FindChaFiles(args[1]))
+  if '--dot' in args:
+    sys.stdout.write(graph.ToDot())
+  else:
+    print(graph.ToJson())
+  exit(1 if graph.Cycles() else 0)
@@ -0,0 +1,88 @@
+"""Tests cha_graph.py."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from cha_graph import ImportGraph, ScanImports
+
+class ScanImportsTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def Write(self, name, text):
+    path = os.path.join(self.root, name)
+    with open(path, 'w', encoding='utf-8') as f:
+      f.write(text)
+    return path
+
+  def Path(self, name):
+    return os.path.join(self.root, name)
+
+  def testFindsImports(self):
+    source = self.Write('甲.cha', '从乙引进我们\n引进丙\n从time引进time为时间\n我是一\n')
+    self.assertEqual([self.Path('乙.cha'), self.Path('丙.cha')], ScanImports(source))
+
+  def testFindsSpacedOutImports(self):
+    source = self.Write('甲.cha', '引 进乙\n从丙引\t进我们\n')
+    self.assertEqual([self.Path('乙.cha'), self.Path('丙.cha')], ScanImports(source))
+
+  def testSkipsMultilineStrings(self):
+    source = self.Write('甲.cha', '我是“““\n引进乙\n”””\n 引进丙\n')
+    self.assertEqual([self.Path('丙.cha')], ScanImports(source))
+
+  def testSkipsComments(self):
+    source = self.Write('甲.cha', '#引进乙\n我是一 #引进丙\n')
+    self.assertEqual([], ScanImports(source))
+
+  def testScansExistingFiles(self):
+    a = self.Write('甲.cha', '引进乙\n引进丁\n')
+    b = self.Write('乙.cha', '我是一\n')
+    self.assertEqual({a: [b], b: []}, ImportGraph.Scan([a, b]).imports)
+
+class ImportGraphTest(unittest.TestCase):
+  def Graph(self, imports):
+    graph = ImportGraph()
+    graph.imports = imports
+    return graph
+
+  def testWaves(self):
+    graph = self.Graph({'a': ['b', 'c'], 'b': ['c'], 'c': [], 'd': ['c']})
+    self.assertEqual([['c'], ['b', 'd'], ['a']], graph.Waves())
+    self.assertEqual([], graph.Cycles())
+
+  def testCycles(self):
+    graph = self.Graph({'a': ['b'], 'b': ['c'], 'c': ['b'], 'd': ['d'], 'e': []})
+    self.assertEqual([['b', 'c'], ['d']], graph.Cycles())
+    self.assertEqual([['b', 'c', 'd', 'e'], ['a']], graph.Waves())
+
+  def testLongChain(self):
+    imports = {str(i): [str(i + 1)] for i in range(5000)}
+    imports['5000'] = []
+    self.assertEqual(5001, len(self.Graph(imports).Waves()))
+
+  def testImporters(self):
+    graph = self.Graph({'a': ['b'], 'b': ['c'], 'c': [], 'd': []})
+    self.assertEqual({'a', 'b', 'c'}, graph.Importers(['c']))
+    graph.Remove('b')
+    self.assertEqual({'c'}, graph.Importers(['c']))
+
+  def testExports(self):
+    graph = self.Graph({'a': ['b'], 'b': ['a']})
+    self.assertEqual(
+        {'imports': {'a': ['b'], 'b': ['a']}, 'waves': [['a', 'b']],
+         'cycles': [['a', 'b']]},
+        json.loads(graph.ToJson()))
+    self.assertEqual(
+        'digraph imports {\n'
+        '  "a" [color=red];\n'
+        '  "b" [color=red];\n'
+        '  "a" -> "b";\n'
+        '  "b" -> "a";\n'
+        '}\n',
+        graph.ToDot())
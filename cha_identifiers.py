@@ -0,0 +1,105 @@
+"""Keeps the Python name of each identifier in a file shared by a whole project."""
+
+import os
+
+try:
+  import fcntl
+except ImportError:
+  # Windows has no fcntl, files are locked with msvcrt there instead.
+  fcntl = None
+  import msvcrt
+
+from cha_token import VariableToken
+
+# Where msvcrt locks a byte of the file, past any data so reads are not blocked.
+_LOCK_OFFSET = 0x7fffffff
+
+def _Lock(f):
+  """Waits for an exclusive lock on an open file."""
+  if fcntl is not None:
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return
+  f.seek(_LOCK_OFFSET)
+  while True:
+    try:
+      msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+      return
+    except OSError:
+      # LK_LOCK only retries for about 10 seconds.
+      pass
+
+def _Unlock(f):
+  """Releases a lock taken by _Lock."""
+  if fcntl is not None:
+    fcntl.flock(f, fcntl.LOCK_UN)
+    return
+  f.seek(_LOCK_OFFSET)
+  msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# File name of the identifier table kept in each project directory.
+IDENTIFIERS_NAME = '.cha_identifiers.tsv'
+
+class IdentifierTable(object):
+  """The Python name given to each identifier, shared by a whole project.
+
+  Names are kept in a file which is only ever appended to, one
+  'identifier\tname' line each, so an identifier keeps its name across files,
+  runs and parallel builds. The file is read when the first name is needed.
+  New names are added while holding a lock on the file, after reading the
+  names other processes added, so two identifiers never get the same name.
+  """
+  def __init__(self, path, base=None):
+    """
+    Args:
+      path: string The file the names are kept in.
+      base: Optional[dict] Names which are always used, such as for 自己.
+    """
+    self.path = path
+    self.char_to_var = dict(base or {})
+    self.var_to_char = {v: k for k, v in self.char_to_var.items()}
+    # How much of the file has been read.
+    self.offset = 0
+    self.loaded = False
+
+  def Get(self, name):
+    """Returns the Python name of an identifier, giving it one if it has none."""
+    if not self.loaded:
+      self.Load()
+    python = self.char_to_var.get(name)
+    if python is None:
+      python = self.Add(name)
+    return python
+
+  def Load(self):
+    """Reads the names added to the file since it was last read."""
+    self.loaded = True
+    if os.path.isfile(self.path):
+      with open(self.path, 'rb') as f:
+        self._ReadFrom(f)
+
+  def Add(self, name):
+    """Gives an identifier a name not used by any other, and records it."""
+    with open(self.path, 'a+b') as f:
+      _Lock(f)
+      try:
+        self._ReadFrom(f)
+        python = self.char_to_var.get(name)
+        if python is None:
+          python = VariableToken(name).Translate(self.char_to_var, self.var_to_char)
+          f.write(('%s\t%s\n' % (name, python)).encode('utf-8'))
+          f.flush()
+          self.offset = f.tell()
+      finally:
+        _Unlock(f)
+    return python
+
+  def _ReadFrom(self, f):
+    f.seek(self.offset)
+    data = f.read()
+    # A line still being written by another process is read next time.
+    end = data.rfind(b'\n') + 1
+    for line in data[:end].decode('utf-8').splitlines():
+      name, python = line.split('\t')
+      self.char_to_var[name] = python
+      self.var_to_char[python] = name
+    self.offset += end
@@ -0,0 +1,44 @@
+"""Tests cha_identifiers.py."""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from cha_identifiers import IdentifierTable, IDENTIFIERS_NAME
+
+def _NameIdentifiers(path, names):
+  table = IdentifierTable(path)
+  return [table.Get(name) for name in names]
+
+class IdentifierTableTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.path = os.path.join(self.root, IDENTIFIERS_NAME)
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def testKeepsNamesBetweenTables(self):
+    table = IdentifierTable(self.path, {'自己': 'zìjǐ'})
+    self.assertEqual(['tā', 'tā1', 'zìjǐ'], [table.Get(n) for n in ('他', '它', '自己')])
+    table = IdentifierTable(self.path, {'自己': 'zìjǐ'})
+    self.assertEqual(['tā1', 'tā'], [table.Get(n) for n in ('它', '他')])
+
+  def testSeesNamesAddedByOthers(self):
+    first = IdentifierTable(self.path)
+    second = IdentifierTable(self.path)
+    self.assertEqual('tā', first.Get('她'))
+    self.assertEqual('tā1', second.Get('他'))
+    self.assertEqual('tā1', first.Get('他'))
+
+  def testProcessesNeverShareNames(self):
+    names = ['他', '她', '它', '塔', '踏']
+    with multiprocessing.Pool(4) as pool:
+      results = pool.starmap(_NameIdentifiers, [(self.path, names[i:] + names[:i]) for i in range(5)])
+    table = IdentifierTable(self.path)
+    expected = [table.Get(name) for name in names]
+    self.assertEqual(len(names), len(set(expected)))
+    for i, result in enumerate(results):
+      self.assertEqual(expected[i:] + expected[:i], result)
@@ -0,0 +1,198 @@
+"""Lets .cha modules be imported directly, without converting them first.
+
+e.g.
+  import cha_import
+  cha_import.Install()
+  import 人人  # Or rénrén, the name converted code imports it by.
+
+Compiled modules are cached in __pycache__, keyed on a hash of the .cha
+source and the translator, so later imports skip translating.
+
+When a directory has the identifier table of a converted project, modules
+and variables are named from it, the same as in the converted files, so
+rénrén1 finds 人人.cha when the project named it that.
+"""
+
+import hashlib
+import importlib.abc
+import importlib.util
+import marshal
+import os
+import sys
+
+import cha_base
+from cha2 import ChaParser, CHAR_TO_VAR_BASE, VAR_TO_CHAR_BASE, FindIdentifiers
+from cha_manifest import TranslatorHash
+from cha_token import VariableToken
+
+# Flags of a PEP 552 hash based .pyc whose source hash should be checked.
+_PYC_FLAGS = (0b11).to_bytes(4, 'little')
+# Names added to every module, the same as 'from cha_base import *'.
+_BASE_NAMES = {
+  name: value for name, value in vars(cha_base).items() if not name.startswith('_')
+}
+
+def TranslateSource(source, directory='', identifiers=None):
+  """Translates the text of a .cha module into Python.
+
+  Lines are kept one to one, and the cha_base import is left out so line
+  numbers match the .cha file.
+
+  Args:
+    source: string The contents of a .cha file.
+    directory: Optional[string] The directory of the file.
+    identifiers: Optional[IdentifierTable] The names used by the project.
+  Returns:
+    string Python source.
+  """
+  parser = ChaParser(directory, convert_imports=False, identifiers=identifiers)
+  return ''.join(parser.TranslateLines(source.splitlines(True)))
+
+def SourceHash(data, named=False):
+  """Returns the 8 byte hash a cached module is keyed on.
+
+  Args:
+    data: bytes The contents of a .cha file.
+    named: Optional[bool] Whether it is named from an identifier table.
+  """
+  prefix = TranslatorHash() + ('\tnamed' if named else '')
+  return hashlib.sha256(prefix.encode('utf-8') + data).digest()[:8]
+
+def CacheFile(path):
+  """Returns the __pycache__ file for a .cha file, apart from any .py of the same name."""
+  return importlib.util.cache_from_source(path + '.py')
+
+class ChaLoader(importlib.abc.Loader):
+  """Loads a .cha module, using the cached code object when the source has not changed."""
+  def __init__(self, fullname, path, identifiers=None):
+    self.name = fullname
+    self.path = path
+    # Optional IdentifierTable of the project the module is in.
+    self.identifiers = identifiers
+
+  def create_module(self, spec):
+    return None
+
+  def exec_module(self, module):
+    code = self.get_code(module.__name__)
+    module.__dict__.update(_BASE_NAMES)
+    exec(code, module.__dict__)
+
+  def get_source(self, fullname):
+    with open(self.path, 'r', encoding='utf-8') as f:
+      return TranslateSource(f.read(), os.path.dirname(self.path), self.identifiers)
+
+  def get_code(self, fullname):
+    with open(self.path, 'rb') as f:
+      data = f.read()
+    key = SourceHash(data, self.identifiers is not None)
+    cache = CacheFile(self.path)
+    code = self._ReadCache(cache, key)
+    if code is None:
+      directory = os.path.dirname(self.path)
+      source = TranslateSource(data.decode('utf-8'), directory + '/' if directory else '',
+                               self.identifiers)
+      code = compile(source, self.path, 'exec', dont_inherit=True)
+      self._WriteCache(cache, key, code)
+    return code
+
+  def _ReadCache(self, cache, key):
+    try:
+      with open(cache, 'rb') as f:
+        data = f.read()
+    except OSError:
+      return None
+    header = importlib.util.MAGIC_NUMBER + _PYC_FLAGS + key
+    if not data.startswith(header):
+      return None
+    try:
+      return marshal.loads(data[len(header):])
+    except (EOFError, ValueError, TypeError):
+      return None
+
+  def _WriteCache(self, cache, key, code):
+    if sys.dont_write_bytecode:
+      return
+    data = importlib.util.MAGIC_NUMBER + _PYC_FLAGS + key + marshal.dumps(code)
+    temp_path = '%s.%d.tmp' % (cache, os.getpid())
+    try:
+      os.makedirs(os.path.dirname(cache), exist_ok=True)
+      with open(temp_path, 'wb') as f:
+        f.write(data)
+      os.replace(temp_path, cache)
+    except OSError:
+      # Caching is optional, e.g. the directory may be read only.
+      pass
+
+class ChaFinder(importlib.abc.MetaPathFinder):
+  """Finds .cha modules on sys.path by their own name or their translated name."""
+  def __init__(self):
+    # Maps a directory to the modification times of it and its identifier
+    # table, and its {name: path} of .cha files.
+    self.directories = {}
+    # The IdentifierTable of each project directory, by path.
+    self.identifiers = {}
+
+  def find_spec(self, fullname, path=None, target=None):
+    name = fullname.rpartition('.')[2]
+    for directory in (path or sys.path):
+      directory = directory or '.'
+      source = self.Modules(directory).get(name)
+      if source:
+        loader = ChaLoader(fullname, source, FindIdentifiers(directory, self.identifiers))
+        return importlib.util.spec_from_file_location(fullname, source, loader=loader)
+    return None
+
+  def Modules(self, directory):
+    """Returns the .cha modules of a directory, by both names."""
+    try:
+      mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+      return {}
+    identifiers = FindIdentifiers(directory, self.identifiers)
+    cached = self.directories.get(directory)
+    if cached is not None and cached[0] == (mtime, self._TableTime(identifiers)):
+      return cached[1]
+    modules = {}
+    try:
+      names = sorted(os.listdir(directory))
+    except OSError:
+      names = []
+    for file_name in names:
+      if not file_name.endswith('.cha'):
+        continue
+      name = file_name[:-4]
+      path = os.path.join(directory, file_name)
+      if identifiers is not None:
+        translated = identifiers.Get(name)
+      else:
+        translated = VariableToken(name).Translate(dict(CHAR_TO_VAR_BASE), dict(VAR_TO_CHAR_BASE))
+      modules.setdefault(translated, path)
+      modules[name] = path
+    self.directories[directory] = ((mtime, self._TableTime(identifiers)), modules)
+    return modules
+
+  def _TableTime(self, identifiers):
+    """Returns when an identifier table last changed, as names may be added to it."""
+    if identifiers is None:
+      return None
+    try:
+      return os.stat(identifiers.path).st_mtime_ns
+    except OSError:
+      return None
+
+  def invalidate_caches(self):
+    self.directories.clear()
+    self.identifiers.clear()
+
+_finder = ChaFinder()
+
+def Install():
+  """Adds the .cha finder to sys.meta_path, after the regular finders."""
+  if _finder not in sys.meta_path:
+    sys.meta_path.append(_finder)
+
+def Uninstall():
+  """Removes the .cha finder from sys.meta_path."""
+  if _finder in sys.meta_path:
+    sys.meta_path.remove(_finder)
@@ -0,0 +1,75 @@
+"""Tests cha_import.py."""
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+import unittest
+from unittest import mock
+
+import cha_import
+
+class ImportHookTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.Write('导入测试人.cha', '种类我们：\n 我是一\n')
+    self.Write('导入测试.cha', '从导入测试人引进我们\n\n甲是我们的我加一\n')
+    sys.path.insert(0, self.root)
+    cha_import.Install()
+    self.write_bytecode = mock.patch.object(sys, 'dont_write_bytecode', False)
+    self.write_bytecode.start()
+
+  def tearDown(self):
+    self.write_bytecode.stop()
+    cha_import.Uninstall()
+    sys.path.remove(self.root)
+    for name in ('导入测试', 'dǎorùcèshìrén', 'dǎorùcèshìrén1', '错误测试'):
+      sys.modules.pop(name, None)
+    shutil.rmtree(self.root)
+
+  def Write(self, name, contents):
+    with open(os.path.join(self.root, name), 'w', encoding='utf-8') as f:
+      f.write(contents)
+
+  def testImportsByChineseName(self):
+    module = importlib.import_module('导入测试')
+    self.assertEqual(2, module.jiǎ)
+
+  def testImportsByTranslatedName(self):
+    module = importlib.import_module('dǎorùcèshìrén')
+    self.assertEqual(1, module.wǒmen.wǒ)
+
+  def testUsesNamesOfConvertedProject(self):
+    self.Write('.cha_identifiers.tsv', '导入测试人\tdǎorùcèshìrén1\n')
+    importlib.invalidate_caches()
+    module = importlib.import_module('dǎorùcèshìrén1')
+    self.assertEqual(1, module.wǒmen.wǒ)
+    self.assertEqual(2, importlib.import_module('导入测试').jiǎ)
+    self.assertNotIn('dǎorùcèshìrén', sys.modules)
+
+  def testKeepsLineNumbers(self):
+    self.Write('错误测试.cha', '甲是一 #注释\n\n提出ValueError（）\n')
+    try:
+      importlib.import_module('错误测试')
+      self.fail('ValueError not raised')
+    except ValueError as e:
+      frame = traceback.extract_tb(e.__traceback__)[-1]
+    self.assertEqual(os.path.join(self.root, '错误测试.cha'), frame.filename)
+    self.assertEqual(3, frame.lineno)
+
+  def testCachesCompiledCode(self):
+    importlib.import_module('导入测试')
+    self.assertTrue(os.path.isfile(cha_import.CacheFile(os.path.join(self.root, '导入测试.cha'))))
+    del sys.modules['导入测试']
+    with mock.patch.object(cha_import, 'TranslateSource', side_effect=AssertionError):
+      module = importlib.import_module('导入测试')
+    self.assertEqual(2, module.jiǎ)
+
+  def testChangedSource_IsTranslatedAgain(self):
+    importlib.import_module('导入测试')
+    del sys.modules['导入测试']
+    self.Write('导入测试.cha', '甲是三\n')
+    importlib.invalidate_caches()
+    self.assertEqual(3, importlib.import_module('导入测试').jiǎ)
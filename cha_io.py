@@ -0,0 +1,87 @@
+"""Reads and writes whole files quickly for converting large .cha sources."""
+
+import codecs
+import io
+import mmap
+import os
+
+# Bytes of a mapped file decoded at a time by ReadLines.
+READ_CHUNK_SIZE = 1 << 20
+# Bytes of output gathered by AtomicWriter before each write.
+WRITE_BUFFER_SIZE = 1 << 20
+
+def ReadLines(path, encoding='utf-8', chunk_size=READ_CHUNK_SIZE):
+  """Yields the lines of a file, mapping it into memory and decoding by chunk.
+
+  Lines end the same way as lines read from a file opened in text mode:
+  '\\r\\n' and '\\r' become '\\n', and the last line may have no newline.
+
+  Args:
+    path: string The file to read.
+    encoding: Optional[string] The encoding of the file.
+    chunk_size: Optional[number] Bytes to decode at a time.
+  Yields:
+    string Each line of the file.
+  """
+  with open(path, 'rb') as f:
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+      return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+      decoder = io.IncrementalNewlineDecoder(
+          codecs.getincrementaldecoder(encoding)(), translate=True)
+      pending = ''
+      for start in range(0, size, chunk_size):
+        lines = (pending + decoder.decode(data[start:start + chunk_size])).split('\n')
+        pending = lines.pop()
+        for line in lines:
+          yield line + '\n'
+      lines = (pending + decoder.decode(b'', final=True)).split('\n')
+      for line in lines[:-1]:
+        yield line + '\n'
+      if lines[-1]:
+        yield lines[-1]
+
+class AtomicWriter(object):
+  """Writes a text file through a large buffer, then moves it into place.
+
+  Output goes to a temporary file next to path, which replaces path only once
+  everything was written, so readers never see a partly written file. If
+  writing fails, path is left as it was.
+
+  e.g.
+  with AtomicWriter('a.py') as f:
+    f.writelines(lines)
+  """
+  def __init__(self, path, encoding='utf-8', buffer_size=WRITE_BUFFER_SIZE):
+    self.path = path
+    # Unique per process, in case several convert the same file at once.
+    self.temp_path = '%s.%d.tmp' % (path, os.getpid())
+    self.file = open(self.temp_path, 'w', encoding=encoding,
+                     buffering=buffer_size)
+
+  def write(self, text):
+    return self.file.write(text)
+
+  def writelines(self, lines):
+    self.file.writelines(lines)
+
+  def Commit(self):
+    """Finishes writing and replaces path with the written file."""
+    self.file.close()
+    os.replace(self.temp_path, self.path)
+
+  def Abort(self):
+    """Stops writing and removes the temporary file, leaving path as it was."""
+    self.file.close()
+    if os.path.exists(self.temp_path):
+      os.remove(self.temp_path)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    if exc_type is None:
+      self.Commit()
+    else:
+      self.Abort()
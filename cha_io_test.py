@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from cha_io import AtomicWriter, ReadLines
+
+class ReadLinesTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.directory)
+    self.path = os.path.join(self.directory, 'a.cha')
+
+  def Write(self, data):
+    with open(self.path, 'wb') as f:
+      f.write(data)
+
+  def testMatchesTextMode(self):
+    self.Write('我是一\r\n你是二\r三\n\n最后'.encode('utf-8'))
+    with open(self.path, 'r', encoding='utf-8') as f:
+      expected = list(f)
+    for chunk_size in (1, 2, 3, 7, 1 << 20):
+      self.assertEqual(expected, list(ReadLines(self.path, chunk_size=chunk_size)))
+
+  def testEndsWithNewline(self):
+    self.Write('一\n二\r\n'.encode('utf-8'))
+    self.assertEqual(['一\n', '二\n'], list(ReadLines(self.path, chunk_size=4)))
+
+  def testEmptyFile(self):
+    self.Write(b'')
+    self.assertEqual([], list(ReadLines(self.path)))
+
+class AtomicWriterTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.directory)
+    self.path = os.path.join(self.directory, 'a.py')
+    with open(self.path, 'w', encoding='utf-8') as f:
+      f.write('old\n')
+
+  def Read(self):
+    with open(self.path, 'r', encoding='utf-8') as f:
+      return f.read()
+
+  def testReplacesFile(self):
+    with AtomicWriter(self.path) as f:
+      f.writelines(['wǒ = 1\n', 'nǐ = 2\n'])
+      self.assertEqual('old\n', self.Read())
+    self.assertEqual('wǒ = 1\nnǐ = 2\n', self.Read())
+    self.assertEqual(['a.py'], os.listdir(self.directory))
+
+  def testKeepsFileOnError(self):
+    with self.assertRaises(ValueError):
+      with AtomicWriter(self.path) as f:
+        f.write('new\n')
+        raise ValueError()
+    self.assertEqual('old\n', self.Read())
+    self.assertEqual(['a.py'], os.listdir(self.directory))
@@ -0,0 +1,106 @@
+"""Records what each converted file was made from, to skip unneeded conversions."""
+
+import hashlib
+import json
+import os
+
+from cha_translation import TRANSLATOR_VERSION, reserved_symbols, reserved_beginning_words, number_symbols, ALWAYS_NEEDS_SPACE
+
+# File name of the manifest kept in each converted directory.
+MANIFEST_NAME = '.cha_manifest.json'
+
+def HashFile(path):
+  """Returns the sha256 hex digest of a file's contents."""
+  with open(path, 'rb') as f:
+    return hashlib.sha256(f.read()).hexdigest()
+
+def TranslatorHash():
+  """Hashes the translator version together with the translation tables.
+
+  Converted files are out of date whenever this changes.
+  """
+  tables = json.dumps([
+      TRANSLATOR_VERSION,
+      reserved_symbols,
+      reserved_beginning_words,
+      number_symbols,
+      sorted(ALWAYS_NEEDS_SPACE),
+  ], sort_keys=True, ensure_ascii=False)
+  return hashlib.sha256(tables.encode('utf-8')).hexdigest()
+
+class BuildManifest(object):
+  """The hash of each converted .cha file and the .py file made from it.
+
+  A file is up to date when neither its contents nor the translator have
+  changed since it was converted. Modification times are only used to skip
+  hashing files which were not touched.
+  """
+  def __init__(self, path):
+    """
+    Args:
+      path: string The manifest file, loaded if it exists.
+    """
+    self.path = path
+    self.directory = os.path.dirname(os.path.abspath(path))
+    self.translator = TranslatorHash()
+    # Maps a source path, relative to directory, to its entry.
+    self.files = {}
+    self.changed = False
+    if os.path.isfile(path):
+      with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+      if data.get('translator') == self.translator:
+        self.files = data.get('files', {})
+      else:
+        self.changed = True
+
+  def _Key(self, path):
+    return os.path.relpath(os.path.abspath(path), self.directory)
+
+  def IsUpToDate(self, source, dest):
+    """Whether dest was converted from the current contents of source.
+
+    Args:
+      source: string The .cha file.
+      dest: string The .py file converted from source.
+    Returns:
+      bool
+    """
+    entry = self.files.get(self._Key(source))
+    if entry is None or entry['dest'] != self._Key(dest) or not os.path.isfile(dest):
+      return False
+    stat = os.stat(source)
+    if [stat.st_mtime_ns, stat.st_size] == entry['stat']:
+      return True
+    if HashFile(source) != entry['hash']:
+      return False
+    # Touched but unchanged, remember the new time so it is not hashed again.
+    entry['stat'] = [stat.st_mtime_ns, stat.st_size]
+    self.changed = True
+    return True
+
+  def IsGenerated(self, dest):
+    """Whether dest is a file this manifest recorded converting."""
+    key = self._Key(dest)
+    return any(entry['dest'] == key for entry in self.files.values())
+
+  def Record(self, source, dest):
+    """Records that dest was just converted from source."""
+    stat = os.stat(source)
+    self.files[self._Key(source)] = {
+      'hash': HashFile(source),
+      'stat': [stat.st_mtime_ns, stat.st_size],
+      'dest': self._Key(dest),
+    }
+    self.changed = True
+
+  def Save(self):
+    """Writes the manifest if anything changed, replacing the old one at once."""
+    if not self.changed:
+      return
+    temp_path = self.path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+      json.dump({'translator': self.translator, 'files': self.files},
+                f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temp_path, self.path)
+    self.changed = False
@@ -0,0 +1,65 @@
+"""Tests cha_manifest.py."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cha_manifest import BuildManifest
+
+class BuildManifestTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.path = os.path.join(self.root, 'manifest.json')
+    self.source = os.path.join(self.root, 'a.cha')
+    self.dest = os.path.join(self.root, 'a.py')
+    self.Write(self.source, '我是一\n')
+    self.Write(self.dest, 'wǒ = 1\n')
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def Write(self, path, contents):
+    with open(path, 'w') as f:
+      f.write(contents)
+
+  def testUnrecordedFile_IsNotUpToDate(self):
+    self.assertFalse(BuildManifest(self.path).IsUpToDate(self.source, self.dest))
+
+  def testRecordedFile_IsUpToDateAfterReload(self):
+    manifest = BuildManifest(self.path)
+    manifest.Record(self.source, self.dest)
+    manifest.Save()
+    self.assertTrue(BuildManifest(self.path).IsUpToDate(self.source, self.dest))
+
+  def testTouchedFile_IsUpToDate(self):
+    manifest = BuildManifest(self.path)
+    manifest.Record(self.source, self.dest)
+    os.utime(self.source, ns=(0, 0))
+    self.assertTrue(manifest.IsUpToDate(self.source, self.dest))
+
+  def testChangedFile_IsNotUpToDate(self):
+    manifest = BuildManifest(self.path)
+    manifest.Record(self.source, self.dest)
+    self.Write(self.source, '我是二\n')
+    os.utime(self.source, ns=(0, 0))
+    self.assertFalse(manifest.IsUpToDate(self.source, self.dest))
+
+  def testMissingDestination_IsNotUpToDate(self):
+    manifest = BuildManifest(self.path)
+    manifest.Record(self.source, self.dest)
+    os.remove(self.dest)
+    self.assertFalse(manifest.IsUpToDate(self.source, self.dest))
+
+  def testOtherTranslator_ForgetsFiles(self):
+    manifest = BuildManifest(self.path)
+    manifest.Record(self.source, self.dest)
+    manifest.translator = 'older'
+    manifest.Save()
+    self.assertFalse(BuildManifest(self.path).IsUpToDate(self.source, self.dest))
+
+  def testIsGenerated(self):
+    manifest = BuildManifest(self.path)
+    self.assertFalse(manifest.IsGenerated(self.dest))
+    manifest.Record(self.source, self.dest)
+    self.assertTrue(manifest.IsGenerated(self.dest))
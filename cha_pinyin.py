@@ -0,0 +1,155 @@
+"""Looks up the pinyin of identifiers from a snapshot of the pinyin package's table.
+
+Importing the pinyin package reads and splits every line of its Mandarin.dat,
+which takes most of the time a short run of cha2 spends starting up. Instead
+the pinyin of each character is built once, written next to this file in
+__pycache__ with marshal, and loaded with a single read on later runs. The
+package is only imported when the snapshot is missing or out of date.
+
+e.g.
+ToPinyin('我们')
+  => 'wǒmen'
+"""
+
+import bisect
+import importlib.machinery
+import marshal
+import os
+import sys
+import unicodedata
+
+# Changed whenever what the snapshot holds changes, so old snapshots are rebuilt.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = 'cha_pinyin.snapshot'
+
+class PinyinTable(object):
+  """The pinyin of each character, kept in two strings so it loads quickly.
+
+  Loading thousands of small strings costs far more than loading two large
+  ones, so the characters are kept sorted in one string, and their pinyin in
+  another, each padded with spaces to the same width.
+  """
+  def __init__(self, chars, pinyin, width, failing):
+    # Every character with pinyin, sorted.
+    self.chars = chars
+    # The pinyin of each character in chars, padded to width.
+    self.pinyin = pinyin
+    self.width = width
+    # Characters the pinyin package fails to give tone marks for.
+    self.failing = failing
+
+  @staticmethod
+  def FromDict(table):
+    """Builds a table from a dict of each character to its pinyin, or None if it fails."""
+    chars = ''.join(sorted(c for c, pinyin in table.items() if pinyin is not None))
+    width = max((len(table[c]) for c in chars), default=0)
+    return PinyinTable(chars, ''.join(table[c].ljust(width) for c in chars), width,
+                       ''.join(sorted(c for c, pinyin in table.items() if pinyin is None)))
+
+  def Get(self, char):
+    """Returns the pinyin of a character, or None if it has none."""
+    i = bisect.bisect_left(self.chars, char)
+    if i == len(self.chars) or self.chars[i] != char:
+      return None
+    return self.pinyin[i * self.width:(i + 1) * self.width].rstrip(' ')
+
+  def Lookup(self, name):
+    """Returns the pinyin of name, the same as pinyin.get.
+
+    Characters without pinyin are kept as they are, in NFC.
+    """
+    if self.failing and any(c in self.failing for c in name):
+      # The pinyin package fails on these characters, so fail the same way.
+      import pinyin
+      return pinyin.get(name)
+    parts = []
+    for c in name:
+      pinyin = self.Get(c)
+      parts.append(unicodedata.normalize('NFC', c) if pinyin is None else pinyin)
+    return ''.join(parts)
+
+def SnapshotFile():
+  """Returns the file the snapshot is kept in."""
+  return os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', SNAPSHOT_NAME)
+
+def SourceKey():
+  """Returns what a snapshot is built from, which it must match to be used.
+
+  Returns:
+    tuple The snapshot version and the path, size and modification time of
+    the data file of the pinyin package, or None if the package is missing.
+  """
+  spec = importlib.machinery.PathFinder.find_spec('pinyin')
+  if spec is None or spec.origin is None:
+    return None
+  data = os.path.join(os.path.dirname(spec.origin), 'Mandarin.dat')
+  try:
+    stat = os.stat(data)
+  except OSError:
+    return None
+  return (SNAPSHOT_VERSION, data, stat.st_size, stat.st_mtime_ns)
+
+def BuildTable():
+  """Returns a PinyinTable of each character the pinyin package knows, with tone marks."""
+  import pinyin
+  table = {}
+  for key in pinyin.pinyin.pinyin_dict:
+    char = chr(int(key, 16))
+    try:
+      table[char] = pinyin.get(char)
+    except RuntimeError:
+      table[char] = None
+  return PinyinTable.FromDict(table)
+
+def ReadSnapshot(path, key):
+  """Returns the PinyinTable of a snapshot built from key, or None if there is none."""
+  try:
+    with open(path, 'rb') as f:
+      snapshot = marshal.loads(f.read())
+  except (OSError, EOFError, ValueError, TypeError):
+    return None
+  if not isinstance(snapshot, tuple) or len(snapshot) != 5 or snapshot[0] != key:
+    return None
+  return PinyinTable(*snapshot[1:])
+
+def WriteSnapshot(path, key, table):
+  """Writes a PinyinTable to a snapshot built from key, if the directory is writable."""
+  if sys.dont_write_bytecode:
+    return
+  data = marshal.dumps((key, table.chars, table.pinyin, table.width, table.failing))
+  temp_path = '%s.%d.tmp' % (path, os.getpid())
+  try:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(temp_path, 'wb') as f:
+      f.write(data)
+    os.replace(temp_path, path)
+  except OSError:
+    # The snapshot is optional, e.g. the directory may be read only.
+    pass
+
+def LoadTable(path=None):
+  """Returns the PinyinTable, from the snapshot if it is up to date.
+
+  Args:
+    path: Optional[string] The snapshot file, defaults to SnapshotFile().
+  Returns:
+    PinyinTable
+  """
+  path = path or SnapshotFile()
+  key = SourceKey()
+  table = ReadSnapshot(path, key) if key is not None else None
+  if table is None:
+    table = BuildTable()
+    if key is not None:
+      WriteSnapshot(path, key, table)
+  return table
+
+# The PinyinTable used by ToPinyin, loaded on first use.
+_table = None
+
+def ToPinyin(name):
+  """Returns the pinyin of name, the same as pinyin.get."""
+  global _table
+  if _table is None:
+    _table = LoadTable()
+  return _table.Lookup(name)
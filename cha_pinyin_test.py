@@ -0,0 +1,76 @@
+"""Tests cha_pinyin.py."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import pinyin
+
+import cha_pinyin
+
+class PinyinTableTest(unittest.TestCase):
+  def setUp(self):
+    self.table = cha_pinyin.PinyinTable.FromDict(
+        {'人': 'rén', '们': 'men', '装': 'zhuāng', '㐻': None})
+
+  def testGetsEachCharacter(self):
+    self.assertEqual('rén', self.table.Get('人'))
+    self.assertEqual('zhuāng', self.table.Get('装'))
+    self.assertIsNone(self.table.Get('a'))
+    self.assertIsNone(self.table.Get('㐻'))
+
+  def testKeepsCharactersWithoutPinyin(self):
+    self.assertEqual('rénmen_2', self.table.Lookup('人们_2'))
+    self.assertEqual('Å', self.table.Lookup('Å'))
+
+  def testFailsLikeThePinyinPackage(self):
+    self.assertRaises(RuntimeError, self.table.Lookup, '人㐻')
+
+class ToPinyinTest(unittest.TestCase):
+  def testMatchesThePinyinPackage(self):
+    for name in ('我们', '艹艹初始艹艹', 'x甲_1', '女', '绿', '\U00020000', ''):
+      self.assertEqual(pinyin.get(name), cha_pinyin.ToPinyin(name), name)
+
+class SnapshotTest(unittest.TestCase):
+  def setUp(self):
+    directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, directory)
+    self.path = os.path.join(directory, 'cha_pinyin.snapshot')
+    self.key = cha_pinyin.SourceKey()
+    self.table = cha_pinyin.PinyinTable.FromDict({'人': 'rén', '㐻': None})
+    self.dont_write_bytecode = sys.dont_write_bytecode
+    sys.dont_write_bytecode = False
+
+  def tearDown(self):
+    sys.dont_write_bytecode = self.dont_write_bytecode
+
+  def testReadsWhatWasWritten(self):
+    cha_pinyin.WriteSnapshot(self.path, self.key, self.table)
+    table = cha_pinyin.ReadSnapshot(self.path, self.key)
+    self.assertEqual('rén', table.Get('人'))
+    self.assertEqual('㐻', table.failing)
+
+  def testIgnoresOtherVersions(self):
+    cha_pinyin.WriteSnapshot(self.path, (0,) + self.key[1:], self.table)
+    self.assertIsNone(cha_pinyin.ReadSnapshot(self.path, self.key))
+
+  def testIgnoresCorruptSnapshots(self):
+    with open(self.path, 'wb') as f:
+      f.write(b'not a snapshot')
+    self.assertIsNone(cha_pinyin.ReadSnapshot(self.path, self.key))
+
+  def testBuildsMissingSnapshot(self):
+    table = cha_pinyin.LoadTable(self.path)
+    self.assertEqual('wǒ', table.Get('我'))
+    self.assertTrue(os.path.isfile(self.path))
+    self.assertEqual(table.chars, cha_pinyin.ReadSnapshot(self.path, self.key).chars)
+
+class ImportTest(unittest.TestCase):
+  def testImportsLazily(self):
+    output = subprocess.check_output(
+        [sys.executable, '-c', 'import sys; import cha2; print("pinyin" in sys.modules)'],
+        cwd=os.path.dirname(os.path.abspath(__file__)))
+    self.assertEqual(b'False', output.strip())
@@ -0,0 +1,72 @@
+"""Collects where the time goes while translating, see ChaParser.AddStageCallback."""
+
+from collections import Counter, OrderedDict
+
+from cha_token import pinyin_cache, TranslateNumber
+
+class Profile(object):
+  """Stage timings, token counts and cache hit rates of one or more ChaParsers."""
+  def __init__(self):
+    # Maps a stage name to [calls, seconds].
+    self.stages = OrderedDict()
+    # Number of each Token class produced by 'tokenize'.
+    self.token_counts = Counter()
+    self.parsers = []
+    self.pinyin_start = (pinyin_cache.hits, pinyin_cache.misses)
+    info = TranslateNumber.cache_info()
+    self.numbers_start = (info.hits, info.misses)
+
+  def Attach(self, parser):
+    """Starts collecting from a parser."""
+    parser.AddStageCallback(self.OnStage)
+    self.parsers.append(parser)
+
+  def Detach(self, parser):
+    """Stops collecting from a parser, keeping the stage timings already collected."""
+    parser.RemoveStageCallback(self.OnStage)
+    self.parsers.remove(parser)
+
+  def OnStage(self, name, seconds, result):
+    stage = self.stages.setdefault(name, [0, 0.0])
+    stage[0] += 1
+    stage[1] += seconds
+    if name == 'tokenize':
+      self.token_counts.update(type(t).__name__ for t in result)
+
+  def CacheStats(self):
+    """Returns the {name: (hits, misses)} of each cache since collecting began."""
+    stats = OrderedDict()
+    stats['pinyin'] = (
+      pinyin_cache.hits - self.pinyin_start[0],
+      pinyin_cache.misses - self.pinyin_start[1],
+    )
+    stats['number_variable_words'] = (
+      sum(p.number_variable_dfa.word_hits for p in self.parsers),
+      sum(p.number_variable_dfa.word_misses for p in self.parsers),
+    )
+    stats['lines'] = (
+      sum(p.line_hits for p in self.parsers),
+      sum(p.line_misses for p in self.parsers),
+    )
+    info = TranslateNumber.cache_info()
+    stats['numbers'] = (
+      info.hits - self.numbers_start[0],
+      info.misses - self.numbers_start[1],
+    )
+    return stats
+
+  def Summary(self):
+    """Returns a printable summary of everything collected."""
+    lines = ['%-24s %8s %10s %10s' % ('Stage', 'Calls', 'Total ms', 'Mean us')]
+    for name, (calls, seconds) in self.stages.items():
+      lines.append('%-24s %8d %10.2f %10.2f' % (name, calls, seconds * 1000, seconds / calls * 1e6))
+    lines.append('')
+    lines.append('%-24s %8s' % ('Token', 'Count'))
+    for name, count in self.token_counts.most_common():
+      lines.append('%-24s %8d' % (name, count))
+    lines.append('')
+    lines.append('%-24s %8s %8s %8s' % ('Cache', 'Hits', 'Misses', 'Rate'))
+    for name, (hits, misses) in self.CacheStats().items():
+      total = hits + misses
+      lines.append('%-24s %8d %8d %7.1f%%' % (name, hits, misses, 100.0 * hits / total if total else 0))
+    return '\n'.join(lines)
@@ -0,0 +1,67 @@
+"""Tests cha_profile.py."""
+
+import unittest
+
+from cha2 import ChaParser
+from cha_profile import Profile
+
+class ProfileTest(unittest.TestCase):
+  def setUp(self):
+    self.profile = Profile()
+
+  def testTimesPipelineStages(self):
+    parser = ChaParser(convert_imports=False)
+    self.profile.Attach(parser)
+    # Lines without strings skip the string automata.
+    parser.ParseLine('我是“一”\n')
+    parser.ParseLine('你是“我”\n')
+    for name in ('characters', 'multiline_string_dfa', 'string_dfa', 'whitespace',
+                 'reserved_words', 'symbols', 'number_variable_dfa', 'tokenize', 'join'):
+      self.assertEqual(2, self.profile.stages[name][0], name)
+
+  def testCountsTokens(self):
+    parser = ChaParser(tokenizer='fused', convert_imports=False)
+    self.profile.Attach(parser)
+    parser.ParseLine('我是一\n')
+    self.assertEqual(1, self.profile.token_counts['VariableToken'])
+    self.assertEqual(1, self.profile.token_counts['NumberToken'])
+    self.assertEqual(1, self.profile.token_counts['SymbolToken'])
+
+  def testCountsCacheHits(self):
+    parser = ChaParser(tokenizer='fused', convert_imports=False)
+    # Otherwise the second line is not tokenized at all.
+    parser.line_cache_size = 0
+    self.profile.Attach(parser)
+    parser.ParseLine('我是一\n')
+    parser.ParseLine('我是一\n')
+    self.assertEqual((2, 2), self.profile.CacheStats()['number_variable_words'])
+
+  def testCountsLineCacheHits(self):
+    parser = ChaParser(convert_imports=False)
+    self.profile.Attach(parser)
+    parser.ParseLine('我是一\n')
+    parser.ParseLine('我是一\n')
+    self.assertEqual((1, 1), self.profile.CacheStats()['lines'])
+
+  def testCountsNumberCacheHits(self):
+    parser = ChaParser(convert_imports=False)
+    self.profile.Attach(parser)
+    parser.ParseLine('我是七七七零一\n')
+    parser.ParseLine('你是七七七零一\n')
+    self.assertEqual((1, 1), self.profile.CacheStats()['numbers'])
+
+  def testSummary(self):
+    parser = ChaParser(convert_imports=False)
+    self.profile.Attach(parser)
+    parser.ParseLine('我是一\n')
+    summary = self.profile.Summary()
+    self.assertIn('symbols', summary)
+    self.assertIn('pinyin', summary)
+
+  def testNoCallbacks_NotTimed(self):
+    parser = ChaParser(convert_imports=False)
+    self.profile.Attach(parser)
+    self.profile.Detach(parser)
+    parser.ParseLine('我是一\n')
+    self.assertEqual({}, self.profile.stages)
+    self.assertEqual([], parser.stage_callbacks)
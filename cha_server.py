@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+
+"""A long running translation server, so each file skips the startup cost.
+
+Listens on a Unix domain socket. Each request and response is one line of
+JSON.
+
+Request:
+  {"source": ".cha text", "tokenizer": "pipeline"}
+Response:
+  {"python": ".py text", "diagnostics": []}
+or, when the source cannot be translated:
+  {"python": null, "diagnostics": [{"line": 3, "type": "DfaException", "message": "..."}]}
+
+Editors can instead keep a document open, and send only their edits. Only
+the lines an edit affects are translated again. Lines and columns count
+from 0, and the response is the same as above.
+  {"document": "a.cha", "source": ".cha text", "tokenizer": "pipeline"}
+  {"document": "a.cha", "edits": [{"start": [0, 2], "end": [0, 3], "text": "二"}]}
+  {"document": "a.cha", "close": true}
+
+When the directory of a request has the identifier table of a converted
+project, variables are named from it, the same as in the converted files.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+
+from cha2 import ChaParser, FindIdentifiers, TOKENIZERS
+from cha_client import DEFAULT_SOCKET
+from cha_document import Document
+
+def RemoveStaleSocket(socket_path):
+  """Removes a socket left behind by a server which is no longer running.
+
+  Anything else at socket_path is left alone, so binding to it fails.
+  """
+  try:
+    mode = os.lstat(socket_path).st_mode
+  except FileNotFoundError:
+    return
+  if not stat.S_ISSOCK(mode):
+    return
+  with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+    try:
+      client.connect(socket_path)
+    except OSError:
+      os.remove(socket_path)
+
+class TranslationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  """Keeps one warm ChaParser per tokenizer and translates requests with it."""
+  daemon_threads = True
+
+  def __init__(self, socket_path=DEFAULT_SOCKET):
+    RemoveStaleSocket(socket_path)
+    super().__init__(socket_path, TranslationHandler)
+    self.socket_path = socket_path
+    self.parsers = {
+      tokenizer: ChaParser(tokenizer=tokenizer, convert_imports=False)
+      for tokenizer in TOKENIZERS
+    }
+    # Open documents by name, each with its own parser.
+    self.documents = {}
+    # The IdentifierTable of each project directory, by path.
+    self.identifiers = {}
+    self.lock = threading.Lock()
+
+  def server_close(self):
+    super().server_close()
+    # Only set once bound, so a path this server failed to bind is left alone.
+    socket_path = getattr(self, 'socket_path', None)
+    if socket_path is not None and os.path.exists(socket_path):
+      os.remove(socket_path)
+
+  def Translate(self, request):
+    """Handles a single request.
+
+    Args:
+      request: dict The decoded request.
+    Raises:
+      ValueError: If the request is malformed.
+    Returns:
+      dict The response.
+    """
+    for field in ('source', 'directory', 'tokenizer'):
+      if not isinstance(request.get(field, ''), str):
+        raise ValueError('%s must be a string: %s' % (field, request[field]))
+    tokenizer = request.get('tokenizer', 'pipeline')
+    if tokenizer not in self.parsers:
+      return {'python': None, 'diagnostics': [
+        {'line': 0, 'type': 'ChaParseException', 'message': 'Unknown tokenizer: %s' % tokenizer}]}
+    if 'document' in request:
+      return self.TranslateDocument(request, tokenizer)
+    source = request.get('source', '')
+    with self.lock:
+      parser = self.parsers[tokenizer]
+      directory = request.get('directory', '')
+      parser.Reset(directory)
+      parser.identifiers = FindIdentifiers(directory, self.identifiers)
+      lines = []
+      for number, line in enumerate(source.splitlines(True), 1):
+        try:
+          lines.extend(parser.TranslateLines([line]))
+        except Exception as e:
+          return {'python': None, 'diagnostics': [
+            {'line': number, 'type': type(e).__name__, 'message': str(e)}]}
+    return {'python': ''.join(lines), 'diagnostics': []}
+
+  def TranslateDocument(self, request, tokenizer):
+    """Opens, edits or closes a document, see the module docstring."""
+    name = request['document']
+    if not isinstance(name, str):
+      raise ValueError('Document names must be strings: %s' % (name,))
+    with self.lock:
+      if request.get('close'):
+        self.documents.pop(name, None)
+        return {'python': None, 'diagnostics': []}
+      if 'source' in request:
+        directory = request.get('directory', '')
+        parser = ChaParser(directory, tokenizer=tokenizer, convert_imports=False,
+                           identifiers=FindIdentifiers(directory, self.identifiers))
+        self.documents[name] = Document(request['source'], parser=parser)
+      document = self.documents.get(name)
+      if document is None:
+        return {'python': None, 'diagnostics': [
+          {'line': 0, 'type': 'ChaParseException', 'message': 'Document not open: %s' % name}]}
+      for edit in request.get('edits', ()):
+        try:
+          start, end, text = tuple(edit['start']), tuple(edit['end']), edit['text']
+        except (KeyError, TypeError):
+          raise ValueError('Edits need a start, an end and text: %s' % (edit,))
+        if len(start) != 2 or len(end) != 2 or not isinstance(text, str):
+          raise ValueError('Edits need a start, an end and text: %s' % (edit,))
+        document.Edit(start, end, text)
+      return {'python': document.Python(), 'diagnostics': document.Diagnostics()}
+
+class TranslationHandler(socketserver.StreamRequestHandler):
+  """Answers each line of JSON on a connection until it is closed."""
+  def handle(self):
+    for line in self.rfile:
+      try:
+        request = json.loads(line.decode('utf-8'))
+        if not isinstance(request, dict):
+          raise ValueError('Request must be a JSON object')
+        response = self.server.Translate(request)
+      except Exception as e:
+        # Any request which fails is answered, so the connection stays open.
+        response = {'python': None, 'diagnostics': [
+          {'line': 0, 'type': type(e).__name__, 'message': str(e)}]}
+      self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+      self.wfile.flush()
+
+def help_command():
+  print("""Runs a server which translates .cha to .py
+
+To use:
+$> cha_server.py [SOCKET]
+
+SOCKET defaults to %s. Use cha_client.py to send files to it.
+""" % DEFAULT_SOCKET)
+
+if __name__ == '__main__':
+  args = sys.argv
+  if '-h' in args:
+    help_command()
+    exit(0)
+  server = TranslationServer(args[1] if len(args) > 1 else DEFAULT_SOCKET)
+  print('Listening on ' + server.socket_path)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
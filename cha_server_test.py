@@ -0,0 +1,125 @@
+"""Tests cha_server.py and cha_client.py."""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import cha_client
+from cha_client import ChaClient
+from cha_server import TranslationServer
+
+class TranslationServerTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.server = TranslationServer(os.path.join(self.root, 'cha.sock'))
+    self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+    self.thread.start()
+    self.client = ChaClient(self.server.socket_path)
+
+  def tearDown(self):
+    self.client.Close()
+    self.server.shutdown()
+    self.thread.join()
+    self.server.server_close()
+    shutil.rmtree(self.root)
+
+  def testTranslates(self):
+    self.assertEqual(
+        {'python': 'class rén(ChaObject):\n  wǒ = 1\n', 'diagnostics': []},
+        self.client.Translate('种类人：\n 我是一\n'))
+
+  def testEachRequestStartsFresh(self):
+    source = '朝们是【超，抄】\n我是“““\n'
+    first = self.client.Translate(source)
+    self.assertEqual(first, self.client.Translate(source))
+    self.assertEqual('zhāomen = [chāo, chāo1]\n', self.client.Translate('朝们是【超，抄】\n')['python'])
+
+  def testUsesNamesOfConvertedProject(self):
+    with open(os.path.join(self.root, '.cha_identifiers.tsv'), 'w', encoding='utf-8') as f:
+      f.write('我\twǒ1\n')
+    self.assertEqual('wǒ1 = 1\n', self.client.Translate('我是一\n', directory=self.root)['python'])
+    self.client.Open('a.cha', '我是一\n', directory=self.root)
+    self.assertEqual('wǒ1 = 1\n', self.client.Edit('a.cha', [])['python'])
+    self.assertEqual('wǒ = 1\n', self.client.Translate('我是一\n')['python'])
+
+  def testUsesFusedTokenizer(self):
+    self.assertEqual('wǒ = 1\n', self.client.Translate('我是一\n', tokenizer='fused')['python'])
+
+  def testReportsErrors(self):
+    response = self.client.Translate('我是一\n我是“不好\n')
+    self.assertIsNone(response['python'])
+    self.assertEqual(2, response['diagnostics'][0]['line'])
+    self.assertEqual('DfaException', response['diagnostics'][0]['type'])
+
+  def testErrorsDoNotAffectLaterRequests(self):
+    self.client.Translate('我是“不好\n')
+    self.assertEqual('wǒ = "好"\n', self.client.Translate('我是“好”\n')['python'])
+
+  def testRejectsRequestsWhichAreNotObjects(self):
+    for request in ([], 'x', 1):
+      response = self.client.Send(request)
+      self.assertIsNone(response['python'])
+      self.assertEqual('ValueError', response['diagnostics'][0]['type'])
+    self.assertEqual('wǒ = 1\n', self.client.Translate('我是一\n')['python'])
+
+  def testRejectsFieldsOfWrongType(self):
+    for request in ({'source': 5}, {'source': '我是一\n', 'directory': []},
+                    {'tokenizer': ['fused']}, {'document': 'a.cha', 'source': 5},
+                    {'document': 'a.cha', 'source': '', 'edits': 5}):
+      response = self.client.Send(request)
+      self.assertIsNone(response['python'], request)
+      self.assertTrue(response['diagnostics'], request)
+    self.assertEqual('wǒ = 1\n', self.client.Translate('我是一\n')['python'])
+
+  def testDefaultSocketIsInRuntimeDirectory(self):
+    with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': self.root}):
+      self.assertEqual(os.path.join(self.root, 'cha.sock'), cha_client.DefaultSocket())
+    with mock.patch.dict(os.environ):
+      os.environ.pop('XDG_RUNTIME_DIR', None)
+      self.assertTrue(cha_client.DefaultSocket().startswith(tempfile.gettempdir()))
+
+  def testKeepsFilesAtSocketPath(self):
+    path = os.path.join(self.root, 'not_a_socket')
+    with open(path, 'w') as f:
+      f.write('keep\n')
+    self.assertRaises(OSError, TranslationServer, path)
+    with open(path) as f:
+      self.assertEqual('keep\n', f.read())
+
+  def testReplacesStaleSocket(self):
+    path = os.path.join(self.root, 'stale.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    server = TranslationServer(path)
+    server.server_close()
+
+  def testKeepsSocketOfRunningServer(self):
+    self.assertRaises(OSError, TranslationServer, self.server.socket_path)
+    self.assertEqual('wǒ = 1\n', self.client.Translate('我是一\n')['python'])
+
+  def testReportsBadEdits(self):
+    self.client.Open('a.cha', '我是一\n')
+    for edits in ([{'start': [10, 0], 'end': [10, 0], 'text': '我'}], [{'text': '我'}], ['x'],
+                  [{'start': [0], 'end': [0, 0], 'text': '我'}]):
+      response = self.client.Send({'document': 'a.cha', 'edits': edits})
+      self.assertEqual('ValueError', response['diagnostics'][0]['type'])
+    self.assertEqual('wǒ = 1\n', self.client.Edit('a.cha', [])['python'])
+
+  def testEditsDocument(self):
+    self.assertEqual(
+        {'python': 'wǒ = 1\nnǐ = 2\n', 'diagnostics': []},
+        self.client.Open('a.cha', '我是一\n你是二\n'))
+    self.assertEqual(
+        {'python': 'wǒ = 1\nnǐ = 3\n', 'diagnostics': []},
+        self.client.Edit('a.cha', [((1, 2), (1, 3), '三')]))
+    response = self.client.Edit('a.cha', [((0, 2), (0, 3), '“')])
+    self.assertIsNone(response['python'])
+    self.assertEqual(1, response['diagnostics'][0]['line'])
+    self.client.CloseDocument('a.cha')
+    response = self.client.Edit('a.cha', [((0, 0), (0, 0), '我')])
+    self.assertEqual('ChaParseException', response['diagnostics'][0]['type'])
@@ -1,12 +1,100 @@
+from collections import OrderedDict
 from enum import Enum
+import functools
+import json
+import os
 
 from cha_translation import reserved_symbols, reserved_beginning_words
-from pinyin import get as ToPinyin
+from dfa import DfaException
+from cha_pinyin import ToPinyin
+
+# Most identifiers kept by pinyin_cache.
+PINYIN_CACHE_SIZE = 100000
+
+class PinyinCache(object):
+  """A least recently used cache of identifier to pinyin, shared by all parsers.
+
+  Can be saved to and loaded from a file so later runs skip the pinyin lookups.
+  """
+  def __init__(self, max_size=PINYIN_CACHE_SIZE):
+    self.max_size = max_size
+    self.table = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+
+  def Get(self, name):
+    """Returns the pinyin of name, looking it up if not yet cached."""
+    pinyin = self.table.get(name)
+    if pinyin is None:
+      self.misses += 1
+      pinyin = ToPinyin(name)
+      self.Add(name, pinyin)
+    else:
+      self.hits += 1
+      self.table.move_to_end(name)
+    return pinyin
+
+  def Add(self, name, pinyin):
+    """Caches pinyin for name, dropping the least recently used if full."""
+    self.table[name] = pinyin
+    self.table.move_to_end(name)
+    while len(self.table) > self.max_size:
+      self.table.popitem(last=False)
+
+  def Clear(self):
+    self.table.clear()
+    self.hits = 0
+    self.misses = 0
+
+  def Load(self, path):
+    """Adds the entries of a file written by Save, if the file exists.
+
+    Args:
+      path: string The file to load.
+    """
+    if not os.path.isfile(path):
+      return
+    with open(path, 'r', encoding='utf-8') as f:
+      for name, pinyin in json.load(f).items():
+        self.Add(name, pinyin)
+
+  def Save(self, path):
+    """Writes the cached entries to a file, least recently used first.
+
+    Args:
+      path: string The file to write.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(self.table, f, ensure_ascii=False)
+
+pinyin_cache = PinyinCache()
 
 class Token(object):
+  __slots__ = ('_value',)
+  # Shared tokens made by Intern, keyed by (class, value).
+  _interned = {}
+
   def __init__(self, value):
     self._value = value
 
+  @classmethod
+  def Intern(cls, value):
+    """Returns a shared token of this class with the given value.
+
+    Tokens are never changed once created, so the fixed symbols, reserved words
+    and indents can share one object per value instead of a new one per use.
+
+    Args:
+      value: string The value of the token.
+    Returns:
+      Token the shared token.
+    """
+    key = (cls, value)
+    token = Token._interned.get(key)
+    if token is None:
+      token = Token._interned[key] = cls(value)
+    return token
+
   def GetValue(self):
     return self._value
 
@@ -16,6 +104,9 @@ class Token(object):
   def __eq__(self, other):
     return self.__class__ == other.__class__ and self.GetValue() == other.GetValue()
 
+  def __hash__(self):
+    return hash((self.__class__, self._value))
+
   def __str__(self):
     return '%s(\'%s\')' % (self.__class__, self.GetValue())
 
@@ -26,6 +117,7 @@ class StringToken(Token):
   """A defined string (not multiline).
   Includes the beginning and ending quotation.
   """
+  __slots__ = ()
   def Translate(self):
     unescape = self._value.replace('\\“', '"').replace('\\”', '"')
     return '"%s"' % unescape[1:-1]
@@ -42,6 +134,7 @@ class MultilineStringToken(Token):
     OR
   abc'''
   """
+  __slots__ = ()
   def Translate(self):
     # print('Translating: %s' + self.GetValue())
     return self.GetValue().replace('“““', '"""').replace('”””', '"""').replace('\\“', '"').replace('\\”', '"').replace('\n', '')
@@ -71,10 +164,144 @@ SCIENTIFIC_CHAR_TO_NUM = {
   '点': '.',
 }
 
+# Most translated numbers kept by TranslateNumber.
+NUMBER_CACHE_SIZE = 100000
+# Digits of N-Ary numbers, in order of value.
+NARY_DIGITS = '零一二三四五六七八九ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+# Python's digits, in the same order as NARY_DIGITS.
+_PYTHON_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+# Prefixes of the bases Python can write numbers in.
+_BASE_PREFIXES = {2: '0b', 8: '0o', 16: '0x'}
+_ARABIC_TABLE = str.maketrans(SCIENTIFIC_CHAR_TO_NUM)
+_NARY_TABLE = str.maketrans(NARY_DIGITS, _PYTHON_DIGITS[:len(NARY_DIGITS)])
+# Values of the digits and units of full name numbers.
+_DIGIT_VALUES = {c: int(n) for c, n in SCIENTIFIC_CHAR_TO_NUM.items() if n.isdigit()}
+_SECTION_UNITS = {'十': 10, '百': 100, '千': 1000}
+_GROUP_UNITS = {'万': 10 ** 4, '亿': 10 ** 8}
+
+def FullnameValue(value):
+  """Computes the value of a full name number in a single pass.
+
+  Units multiply the digit before them, or one if there is none, and 万 and
+  亿 multiply everything since the last larger group. A digit right after a
+  unit is shorthand for the next smaller unit, as in 一百二 for 120, unless
+  零 comes between them.
+
+  e.g.
+  FullnameValue('七百五十五万零三千四百九十九')
+    => 7553499
+
+  Args:
+    value: string A full name number, optionally starting with 负.
+  Returns:
+    number The value.
+  """
+  sign = 1
+  if value.startswith('负'):
+    sign = -1
+    value = value[1:]
+  # Totals of the finished 亿 groups, the finished 万 group and the rest.
+  total = group = section = 0
+  digit = None
+  unit = 1
+  zero = False
+  for c in value:
+    if c in _DIGIT_VALUES:
+      digit = _DIGIT_VALUES[c]
+      zero = zero or c == '零'
+      continue
+    if c in _SECTION_UNITS:
+      unit = _SECTION_UNITS[c]
+      section += (1 if digit is None else digit) * unit
+    else:
+      rest = section + _PendingDigit(digit, unit, zero)
+      # A group unit with nothing before it, such as 万 or 亿, is one of it.
+      if digit is None and not section and (c == '万' or not group):
+        rest = 1
+      if c == '万':
+        group += rest * 10 ** 4
+      else:
+        total += (group + rest) * 10 ** 8
+        group = 0
+      unit = _GROUP_UNITS[c]
+      section = 0
+    digit = None
+    zero = False
+  return sign * (total + group + section + _PendingDigit(digit, unit, zero))
+
+def _PendingDigit(digit, unit, zero):
+  """The value of a digit not followed by a unit, see FullnameValue."""
+  if digit is None:
+    return 0
+  if zero or unit < 10:
+    return digit
+  return digit * (unit // 10)
+
+def NaryText(value):
+  """Translates an N-Ary number, such as 二进一零一, to Python.
+
+  Binary, octal and hexadecimal numbers keep their digits, other bases are
+  written in decimal.
+
+  Raises:
+    DfaException: If there are no digits, or digits not of the base.
+  """
+  sign = ''
+  if value.startswith('负'):
+    sign = '-'
+    value = value[1:]
+  base, digits = value.split('进')
+  base = int(base.translate(_ARABIC_TABLE))
+  if not 0 < base <= len(NARY_DIGITS):
+    raise DfaException('Base %d of an N-Ary number is not between 1 and %d: %s'
+                       % (base, len(NARY_DIGITS), value))
+  if not digits:
+    raise DfaException('N-Ary number has no digits: %s' % value)
+  invalid = set(digits) - set(NARY_DIGITS[:base])
+  if invalid:
+    raise DfaException('Not digits of base %d: %s in %s' % (base, ''.join(sorted(invalid)), value))
+  digits = digits.translate(_NARY_TABLE)
+  if base in _BASE_PREFIXES:
+    return sign + _BASE_PREFIXES[base] + digits
+  if base < 2:
+    # Only 零 is a digit of base 1.
+    return sign + '0'
+  return sign + str(int(digits, base))
+
+def ArabicText(value):
+  """Translates an arabic or scientific number, such as 一点五E三, to Python.
+
+  Whole numbers lose their leading zeros, which Python does not allow.
+  """
+  text = value.translate(_ARABIC_TABLE)
+  if text.lstrip('-').isdigit():
+    return str(int(text))
+  return text
+
+@functools.lru_cache(maxsize=NUMBER_CACHE_SIZE)
+def TranslateNumber(value, format):
+  """Translates a number to Python, remembering the most recent numbers.
+
+  Args:
+    value: string The number as written in .cha.
+    format: NumberFormat How the number is written.
+  Returns:
+    string The Python number.
+  """
+  if format == NumberFormat.ARABIC or format == NumberFormat.SCIENTIFIC:
+    return ArabicText(value)
+  if format == NumberFormat.FULLNAME or format == NumberFormat.SHORTHAND:
+    return str(FullnameValue(value))
+  if format == NumberFormat.NARY:
+    return NaryText(value)
+  raise Exception('Format not supported: %s' % format)
+
 class NumberToken(Token):
   """A number token, can be of various forms:
   e.g. 0b10101010, 0x01afb, 123 -123 0.0052 122.2
   """
+  __slots__ = ('format',)
+
   def __init__(self, value, format=NumberFormat.ARABIC):
     super().__init__(value)
     self.format = format
@@ -83,75 +310,32 @@ class NumberToken(Token):
     return self.format
 
   def Translate(self):
-    #TO_DO
-    value = self.GetValue()
-    if self.format == NumberFormat.ARABIC:
-        return ''.join(SCIENTIFIC_CHAR_TO_NUM[c] for c in value)
-    elif self.format == NumberFormat.SHORTHAND:
-        pass
-    elif self.format == NumberFormat.FULLNAME:
-        ds = ['0','0','0','0']
-        a = '1'
-        added_wan = True
-        for c in value:
-            if c == '负':
-                ds.insert(0, SCIENTIFIC_CHAR_TO_NUM[c])
-            elif c not in '十百千万亿':
-                a = SCIENTIFIC_CHAR_TO_NUM[c]
-            elif c == '十':
-                ds[-2] = a
-                a = '0'
-            elif c == '百':
-                ds[-3] = a
-                a = '0'
-            elif c == '千':
-                ds[-4] = a
-                a = '0'
-            elif c == '万':
-                ds[-1] = a
-                for l in range(4): ds.append('0')
-                added_wan = True
-                a = '0'
-            elif c == '亿':
-                ds[-1] = a
-                for l in range(4): ds.append('0')
-                added_wan = False
-                a = '0'
-            #print(ds)
-        if value[-1] not in '十百千万亿':
-            ds[-1] = a
-            #print(ds)
-        if not added_wan:
-            for l in range(4): ds.insert(4, '0')
-            added_wan = True
-            #print(ds)
-        while ds[0] == '0':
-          ds = ds[1:]
-        return ''.join(ds)
-
-
-    elif self.format == NumberFormat.NARY:
-      pass
-    raise Exception('Format not supported: %s' % self.format)
+    return TranslateNumber(self.GetValue(), self.format)
 
   def __eq__(self, other):
     return super().__eq__(other) and self.GetFormat() == other.GetFormat()
 
+  def __hash__(self):
+    return hash((self.__class__, self._value, self.format))
+
 class SymbolToken(Token):
   """A single symbol:
   e.g. +, -, &, &=, "
   """
+  __slots__ = ()
   def Translate(self):
     return reserved_symbols[self.GetValue()]
 
 class WhitespaceToken(Token):
   """Whitespace formatting comprised of only tabs or spaces."""
+  __slots__ = ()
   def Translate(self):
     val = self.GetValue()
     return val.replace(' ', '  ').replace('\t', '  ')
 
 class EndToken(Token):
   """End of Line Token. Holds no values."""
+  __slots__ = ()
   def __init__(self, comment=''):
     super().__init__(comment)
   def Translate(self):
@@ -162,12 +346,15 @@ class EndToken(Token):
 
 class VariableToken(Token):
   """Variable names for classes, functions, and so on."""
+  __slots__ = ()
   def Translate(self, c2v=None, v2c=None):
-    c2v = c2v or {}
-    v2c = v2c or {}
+    if c2v is None:
+      c2v = {}
+    if v2c is None:
+      v2c = {}
     if self.GetValue() in c2v:
       return c2v[self.GetValue()]
-    pinyin = ToPinyin(self.GetValue())
+    pinyin = pinyin_cache.Get(self.GetValue())
     o_pinyin = pinyin
     offset = 0
     while o_pinyin in v2c:
@@ -179,8 +366,10 @@ class VariableToken(Token):
 
 class ReservedWordToken(Token):
   """Python words such as class, def, True, and False."""
+  __slots__ = ()
   def Translate(self):
     return reserved_beginning_words[self.GetValue()]
 
 class ParseToken(Token):
   """Special tokens for parsing special parts."""
+  __slots__ = ()
@@ -1,4 +1,9 @@
+import os
+import tempfile
+import unittest
+
 import cha_token
+from dfa import DfaException
 
 
 t1 = cha_token.NumberToken('三亿零三十三', cha_token.NumberFormat.FULLNAME)
@@ -15,3 +20,87 @@ t5 = cha_token.NumberToken('一万', cha_token.NumberFormat.FULLNAME)
 print(t5.Translate())
 t5 = cha_token.NumberToken('七百五十五万零三千四百九十九', cha_token.NumberFormat.FULLNAME)
 print(t5.Translate())
+
+
+class PinyinCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.cache = cha_token.PinyinCache(max_size=2)
+
+  def testCachesLookups(self):
+    self.assertEqual('rén', self.cache.Get('人'))
+    self.assertEqual('rén', self.cache.Get('人'))
+    self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+  def testDropsLeastRecentlyUsed(self):
+    self.cache.Get('人')
+    self.cache.Get('我')
+    self.cache.Get('人')
+    self.cache.Get('你')
+    self.assertEqual(['人', '你'], list(self.cache.table))
+
+  def testSavesAndLoads(self):
+    self.cache.Add('人', 'rén')
+    loaded = cha_token.PinyinCache()
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'pinyin.json')
+      self.cache.Save(path)
+      loaded.Load(path)
+    self.assertEqual('rén', loaded.Get('人'))
+    self.assertEqual(0, loaded.misses)
+
+class TokenInternTest(unittest.TestCase):
+  def testSharesTokens(self):
+    symbol = cha_token.SymbolToken.Intern('（')
+    self.assertIs(symbol, cha_token.SymbolToken.Intern('（'))
+    self.assertEqual(symbol, cha_token.SymbolToken('（'))
+    self.assertIsNot(symbol, cha_token.ReservedWordToken.Intern('（'))
+
+  def testHashMatchesEquality(self):
+    tokens = {cha_token.VariableToken('甲'), cha_token.VariableToken('甲'),
+        cha_token.SymbolToken('甲'),
+        cha_token.NumberToken('一', cha_token.NumberFormat.ARABIC),
+        cha_token.NumberToken('一', cha_token.NumberFormat.FULLNAME)}
+    self.assertEqual(len(tokens), 4)
+
+  def testHasNoInstanceDict(self):
+    with self.assertRaises(AttributeError):
+      cha_token.EndToken().extra = True
+
+class TranslateNumberTest(unittest.TestCase):
+  def Translate(self, value, format):
+    return cha_token.NumberToken(value, format).Translate()
+
+  def testFullname(self):
+    for value, expected in (
+        ('十', '10'), ('十三', '13'), ('百零二', '102'), ('二千零零七', '2007'),
+        ('万', '10000'), ('零万', '0'), ('一万亿', '1000000000000'),
+        ('三亿零三十三', '300000033'), ('七百五十五万零三千四百九十九', '7553499'),
+        ('负十三', '-13')):
+      self.assertEqual(expected, self.Translate(value, cha_token.NumberFormat.FULLNAME), value)
+
+  def testShorthand(self):
+    for value, expected in (('一百二', '120'), ('两千一', '2100'), ('三万五', '35000'),
+                            ('三亿五', '350000000'), ('一百零二', '102')):
+      self.assertEqual(expected, self.Translate(value, cha_token.NumberFormat.FULLNAME), value)
+      self.assertEqual(expected, self.Translate(value, cha_token.NumberFormat.SHORTHAND), value)
+
+  def testArabic(self):
+    for value, expected in (('一二三点三', '123.3'), ('零九', '9'), ('负零二七', '-27'),
+                            ('三七三E三九', '373e39'), ('一E二i', '1e2j'), ('点五', '.5')):
+      self.assertEqual(expected, self.Translate(value, cha_token.NumberFormat.ARABIC), value)
+
+  def testNary(self):
+    for value, expected in (('二进一零一零一零一', '0b1010101'), ('八进一二三四五六七零', '0o12345670'),
+                            ('一六进FF零零FF', '0xff00ff'), ('一二进BB', '143'),
+                            ('三五进YY', '1224'), ('负二进一', '-0b1'), ('一进零', '0')):
+      self.assertEqual(expected, self.Translate(value, cha_token.NumberFormat.NARY), value)
+
+  def testRejectsMalformedNary(self):
+    for value in ('三进人', '三进', '三进一点', '二进', '二进二', '三七进一'):
+      self.assertRaises(DfaException, self.Translate, value, cha_token.NumberFormat.NARY)
+
+  def testRemembersNumbers(self):
+    self.Translate('五五五四三二一', cha_token.NumberFormat.ARABIC)
+    hits = cha_token.TranslateNumber.cache_info().hits
+    self.assertEqual('5554321', self.Translate('五五五四三二一', cha_token.NumberFormat.ARABIC))
+    self.assertEqual(hits + 1, cha_token.TranslateNumber.cache_info().hits)
@@ -1,4 +1,8 @@
 
+# Change whenever the translation of existing .cha code changes, so that
+# converted files are no longer considered up to date.
+TRANSLATOR_VERSION = '2.3'
+
 # These words are reserved Python words and symbols
 reserved_symbols = {
   # Symbols based on https://docs.python.org/3/genindex-Symbols.html
@@ -131,9 +135,8 @@ ALWAYS_NEEDS_SPACE = frozenset((
   'elif',
 ))
 
-def NeedsSpace(left, right):
-  l = left.Translate()
-  r = right.Translate()
+def TextNeedsSpace(l, r):
+  """Whether a space goes between two neighbouring translated pieces."""
   if l in ALWAYS_NEEDS_SPACE or r in ALWAYS_NEEDS_SPACE:
     if (l, r) == ('else', ':'):
       return False
@@ -142,9 +145,70 @@ def NeedsSpace(left, right):
     return True
   return False
 
+def NeedsSpace(left, right):
+  return TextNeedsSpace(left.Translate(), right.Translate())
+
+# Kinds of translated text, all text of a kind is spaced the same way.
+PLAIN, SPACED, ELSE, COLON, COMMA = range(5)
+
+# Maps translated text to its kind, text missing from here is PLAIN.
+spacing_kinds = {text: SPACED for text in ALWAYS_NEEDS_SPACE}
+spacing_kinds.update({'else': ELSE, ':': COLON, ',': COMMA})
+
+# spacing_table[left kind][right kind] is whether a space goes between them.
+_KIND_EXAMPLES = {PLAIN: '', SPACED: '=', ELSE: 'else', COLON: ':', COMMA: ','}
+spacing_table = tuple(
+    tuple(TextNeedsSpace(_KIND_EXAMPLES[l], _KIND_EXAMPLES[r]) for r in range(5))
+    for l in range(5))
+
 # Symbols that should be checked for first.
 symbol_order = sorted(reserved_symbols.keys(), key=lambda s: -len(s))
 
+# Key marking the end of a word in a trie node.
+TRIE_END = ''
+
+def BuildTrie(words):
+  """Builds a prefix trie out of nested dicts.
+
+  Each node maps a character to its child node; a node that ends a word also
+  maps TRIE_END to that word.
+
+  Args:
+    words: Iterable[string] The words to add, empty words are skipped.
+  Returns:
+    dict The root node of the trie.
+  """
+  root = {}
+  for word in words:
+    if not word: continue
+    node = root
+    for c in word:
+      node = node.setdefault(c, {})
+    node[TRIE_END] = word
+  return root
+
+def LongestMatch(trie, tokens, start=0):
+  """Finds the longest word in trie spelled by tokens beginning at start.
+
+  Args:
+    trie: dict A trie created by BuildTrie.
+    tokens: Array[string|Token] Characters, possibly mixed with Tokens.
+    start: Optional[number] The index to begin matching from.
+  Returns:
+    string The longest matching word, or '' if there is none.
+  """
+  node = trie
+  match = ''
+  for i in range(start, len(tokens)):
+    token = tokens[i]
+    if not isinstance(token, str): break
+    node = node.get(token)
+    if node is None: break
+    match = node.get(TRIE_END, match)
+  return match
+
+symbol_trie = BuildTrie(reserved_symbols)
+
 number_symbols = {
   '十六进': '0x', # Hex string representation
   '八进': '0o', # Octal string representation
@@ -189,6 +253,32 @@ reserved_beginning_words = {
 }
 sorted_beginning_words = sorted(reserved_beginning_words.keys(), key=lambda s: -len(s))
 
+# Maps the first character of each reserved beginning word to the words
+# starting with it, longest first.
+beginning_word_table = {}
+for word in sorted_beginning_words:
+  if word:
+    beginning_word_table.setdefault(word[0], []).append(word)
+
+def MatchBeginningWord(tokens, start=0):
+  """Finds the longest reserved beginning word spelled by tokens at start.
+
+  Most lines start with a variable, which only costs one dict lookup.
+
+  Args:
+    tokens: string|Array[string|Token] The text or tokens to match.
+    start: Optional[number] The index to match at.
+  Returns:
+    (string, number)|None The word and the index just after it, or None.
+  """
+  if start >= len(tokens):
+    return None
+  for word in beginning_word_table.get(tokens[start], ()):
+    end = start + len(word)
+    if tokens[start:end] == (word if isinstance(tokens, str) else list(word)):
+      return word, end
+  return None
+
 PyToCha = {
   '#': '#',
 }
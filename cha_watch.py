@@ -0,0 +1,97 @@
+"""Retranslates the .cha files in a directory tree whenever they change."""
+
+import os
+import time
+
+from cha2 import ChaParser
+from cha_build import FindChaFiles, DestinationFile, ProjectIdentifiers
+from cha_graph import ImportGraph, ScanImports
+from cha_manifest import BuildManifest, MANIFEST_NAME
+
+# Seconds between checks for changed files.
+POLL_INTERVAL = 0.5
+
+class Watcher(object):
+  """Polls a directory tree and converts the .cha files that changed.
+
+  Files importing a changed file are converted again too. Which files import
+  which is found by scanning the import lines of each changed file, and
+  updated with the imports the parser finds while converting. Like
+  cha_build, each file is converted on its own rather than along with the
+  files it imports.
+
+  A single parser is reused for every conversion, so its automata and caches
+  stay warm and each round only costs as much as the files it converts.
+  """
+  def __init__(self, root, tokenizer='pipeline', interval=POLL_INTERVAL):
+    self.root = root
+    self.interval = interval
+    self.manifest = BuildManifest(os.path.join(root, MANIFEST_NAME))
+    self.identifiers = ProjectIdentifiers(root)
+    self.parser = ChaParser(tokenizer=tokenizer, interactive=False,
+                            manifest=self.manifest,
+                            identifiers=self.identifiers)
+    # Last seen (mtime_ns, size) of each .cha file.
+    self.snapshot = {}
+    self.graph = ImportGraph()
+
+  def Scan(self):
+    """Returns the (mtime_ns, size) of each .cha file under root."""
+    snapshot = {}
+    for source in FindChaFiles(self.root):
+      try:
+        stat = os.stat(source)
+      except FileNotFoundError:
+        continue
+      snapshot[os.path.normpath(source)] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+  def Poll(self):
+    """Converts the files changed since the last poll, and the files importing them.
+
+    The first poll only converts the files the manifest shows are out of date,
+    and the files importing them.
+
+    Returns:
+      Array[string] The .cha files converted, in order.
+    """
+    snapshot = self.Scan()
+    changed = [s for s, stat in snapshot.items() if self.snapshot.get(s) != stat]
+    for source in self.snapshot.keys() - snapshot.keys():
+      self.graph.Remove(source)
+    first_poll = not self.snapshot
+    self.snapshot = snapshot
+    for source in changed:
+      self.graph.SetImports(source, ScanImports(source, self.parser))
+    if first_poll:
+      changed = [s for s in changed
+                 if not self.manifest.IsUpToDate(s, DestinationFile(s, self.identifiers))]
+
+    converted = []
+    for source in sorted(self.graph.Importers(changed)):
+      if source not in snapshot:
+        continue
+      directory = os.path.dirname(source)
+      self.parser.Reset(directory + '/' if directory else '')
+      # Other files of the tree are converted on their own when they change.
+      self.parser.imported_files.update(f for f in snapshot if f != source)
+      try:
+        self.parser.Convert(source, DestinationFile(source, self.identifiers), update=True)
+      except Exception as e:
+        print('Failed converting %s: %s' % (source, e))
+      else:
+        self.graph.SetImports(source, (
+            os.path.normpath(f) for f in self.parser.imports.get(source, ())))
+      converted.append(source)
+    self.manifest.Save()
+    return converted
+
+  def Run(self):
+    """Polls until interrupted."""
+    print('Watching %s for changes, press Ctrl-C to stop' % self.root)
+    try:
+      while True:
+        self.Poll()
+        time.sleep(self.interval)
+    except KeyboardInterrupt:
+      pass
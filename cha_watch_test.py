@@ -0,0 +1,71 @@
+"""Tests cha_watch.py."""
+
+from contextlib import redirect_stdout
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from cha_watch import Watcher
+
+BIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bin')
+
+class WatcherTest(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    for name in ('example.cha', '人人.cha'):
+      shutil.copy(os.path.join(BIN, name), self.root)
+    self.Write('其他.cha', '我是一\n')
+    self.watcher = Watcher(self.root)
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def Path(self, name):
+    return os.path.join(self.root, name)
+
+  def Write(self, name, text):
+    with open(self.Path(name), 'a', encoding='utf-8') as f:
+      f.write(text)
+
+  def Poll(self):
+    with redirect_stdout(io.StringIO()):
+      return self.watcher.Poll()
+
+  def testFirstPollConvertsEverything(self):
+    self.assertEqual(
+        [self.Path(name) for name in ('example.cha', '人人.cha', '其他.cha')],
+        self.Poll())
+    for name in ('example.py', 'rénrén.py', 'qítā.py'):
+      self.assertTrue(os.path.isfile(self.Path(name)), name)
+
+  def testSkipsUnchangedFiles(self):
+    self.Poll()
+    self.assertEqual([], self.Poll())
+
+  def testConvertsImporters(self):
+    self.Poll()
+    self.Write('人人.cha', '他们是一\n')
+    self.assertEqual(
+        [self.Path('example.cha'), self.Path('人人.cha')], self.Poll())
+    with open(self.Path('rénrén.py'), encoding='utf-8') as f:
+      self.assertIn('tāmen = 1', f.read())
+
+  def testConvertsOnlyChangedFile(self):
+    self.Poll()
+    self.Write('example.cha', '我是二\n')
+    self.assertEqual([self.Path('example.cha')], self.Poll())
+
+  def testNewFile(self):
+    self.Poll()
+    self.Write('新.cha', '我是一\n')
+    self.assertEqual([self.Path('新.cha')], self.Poll())
+
+  def testFirstPollSkipsUpToDateFiles(self):
+    self.Poll()
+    self.watcher = Watcher(self.root)
+    self.assertEqual([], self.Poll())
+    self.Write('人人.cha', '他们是一\n')
+    self.assertEqual(
+        [self.Path('example.cha'), self.Path('人人.cha')], self.Poll())
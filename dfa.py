@@ -2,19 +2,33 @@ class DfaException(Exception):
   """Raised when bad strings are created."""
   pass
 
+# Transition table key used for any Token input, which are not characters.
+TOKEN = '<Token>'
+
+def InputKey(char):
+  """Returns the transition table key for an input character or Token."""
+  return char if isinstance(char, str) else TOKEN
+
 class State(object):
   """A single state used by StringDfa."""
   def __init__(self, state_name):
     # The name given to this State, only for cosmetic purposes.
     self.name = state_name
+    # Compiled transitions, maps an input key to the next State.
+    self.table = {}
+    # State for inputs missing from the table, None if those are invalid.
+    self.default = None
+    # Input keys that never go to the default State.
+    self.default_excludes = frozenset()
     # Array of (function, State) tuples.
     # Function returns True if the given character should go to State.
+    # Only checked for inputs missing from the table.
     self.deltas = []
     # Occurs on transition from Start to Inside.
     self.just_started = False
 
   def GetNextState(self, char):
-    """Returns the first state that accepts the given character.
+    """Returns the state that accepts the given character.
 
     Args:
       char: string A string of length 1 with the next char to check.
@@ -23,16 +37,63 @@ class State(object):
     Returns:
       State a state representing the next object.
     """
+    ns = self.table.get(char if isinstance(char, str) else TOKEN)
+    if ns is None:
+      ns = self.Resolve(char)
+    if self.name == 'Start':
+      self.just_started = True
+    return ns
+
+  def Resolve(self, char):
+    """Finds the next state for an input missing from the table.
+
+    Inputs that go to the default state are added to the table, so each one
+    is only resolved once.
+
+    Args:
+      char: string|Token The next input to check.
+    Raises:
+      DfaException when no transition is defined.
+    Returns:
+      State the next state.
+    """
     for (fn, ns) in self.deltas:
       if fn(char):
-        if self.name == 'Start':
-          self.just_started = True
         return ns
+    key = InputKey(char)
+    if self.default is not None and key not in self.default_excludes:
+      self.table[key] = self.default
+      return self.default
     raise DfaException('No transition for %s with %s' % (self.name, char))
 
+  def AddTransition(self, keys, next_state):
+    """Adds table transitions for each of the given input keys.
+
+    Keys which already have a transition keep it, so earlier transitions take
+    priority the same way earlier deltas do.
+
+    Args:
+      keys: Iterable[string] Characters, or TOKEN, which should go to next_state.
+      next_state: State The next state to go to for these keys.
+    """
+    for key in keys:
+      self.table.setdefault(key, next_state)
+
+  def SetDefault(self, next_state, excludes=''):
+    """Sets the state for all inputs which have no other transition.
+
+    Args:
+      next_state: State The next state to go to.
+      excludes: Optional[Iterable[string]] Keys which should not use the default.
+    """
+    self.default = next_state
+    self.default_excludes = frozenset(excludes)
+
   def AddDelta(self, fn, next_state):
     """Adds a new delta to deltas.
 
+    Deltas are slower than table transitions, prefer AddTransition.
+
     Args:
       fn: function(string): bool A function that takes a single character and returns True or False
       next_state: State The next state to go to with this delta if fn(c) is true.
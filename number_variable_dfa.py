@@ -2,19 +2,22 @@
 
 """Utility to extract Number and Variable Tokens from an array of tokens already parsed for other Tokens."""
 
-from cha_token import Token, NumberFormat, NumberToken, VariableToken, ReservedWordToken, WhitespaceToken, SymbolToken
+from cha_token import Token, NumberFormat, NumberToken, VariableToken, ReservedWordToken, WhitespaceToken, SymbolToken, NARY_DIGITS
 
 from cha_translation import number_symbols
-from dfa import Dfa, DfaException
+from dfa import Dfa, DfaException, TOKEN
+from dfa import State as TableState
 
-class State(object):
+DIGITS = '零一二三四五六七八九'
+# Multipliers used by full name numbers.
+UNITS = '十百千万亿'
+# Characters which cannot start or continue a variable name.
+NOT_CHARACTERS = DIGITS + '点' + UNITS + 'E'
+
+class State(TableState):
     """A single state used by NumberVariableDfa."""
     def __init__(self, state_name):
-        # The name given to this State, only for cosmetic purposes.
-        self.name = state_name
-        # Array of (function, State) tuples.
-        # Function returns True if the given character should go to State.
-        self.deltas = []
+        super().__init__(state_name)
         # Occurs on transition from Ready to other state.
         self.just_started = False
         # for D1 and D2 state
@@ -23,39 +26,50 @@ class State(object):
         self.base_s = ''
         self.base_i = None
 
+    def Resolve(self, char):
+        try:
+            return super().Resolve(char)
+        except DfaException:
+            raise DfaException('No transition for %s with %s. Invalid Format' % (self.name, char))
+
+class NaryState(State):
+    """The NARY state, whose valid digits depend on the base it was given."""
+    def __init__(self, state_name, nar, variable):
+        super().__init__(state_name)
+        self.nar = nar
+        self.variable = variable
+        # Transitions of characters for each base, created when first needed.
+        self.base_states = {}
+
     def GetNextState(self, char):
-        """Returns the first state that accepts the given character.
+        if not isinstance(char, str):
+            return self.nar
+        base_state = self.base_states.get(self.base_i)
+        if base_state is None:
+            base_state = self.base_states[self.base_i] = self.CreateBaseState(self.base_i)
+        return base_state.GetNextState(char)
 
-        Args:
-            char: string A string of length 1 with the next char to check.
-        Raises:
-            DfaException when no transition is defined.
-        Returns:
-            State a state representing the next object.
-        """
-        for (fn, ns) in self.deltas:
-            if self.name != 'Nary':
-                if fn(char):
-                    if self.name == 'Ready' and ns.name != 'Ready':
-                        self.just_started = True
-                    if ns.name == 'D1' or ns.name =='D2':
-                        ns.base_s = self.base_s + number_symbols[char]
-                    elif ns.name == 'Nary':
-                        ns.base_i = int(self.base_s)
-                    return ns
-            else:
-                if fn(char, self.base_i):
-                    return ns
-        raise DfaException('No transition for %s with %s. Invalid Format' % (self.name, char))
+    def CreateBaseState(self, base):
+        """Creates the character transitions for numbers of the given base.
 
-    def AddDelta(self, fn, next_state):
-        """Adds a new delta to deltas.
+        Digits too large for the base may still start a variable name, while
+        characters which are not digits at all are kept as part of the number.
 
-        Args:
-            fn: function(string): bool A function that takes a single character and returns True or False
-            next_state: State The next state to go to with this delta if fn(c) is true.
+        Raises:
+            DfaException: If the base is not between 1 and 36.
         """
-        self.deltas.append((fn, next_state))
+        if not 0 < base <= len(NARY_DIGITS):
+            raise DfaException('Base %d of an N-Ary number is not between 1 and %d'
+                               % (base, len(NARY_DIGITS)))
+        base_state = State(self.name)
+        invalid_digits = NARY_DIGITS[base:]
+        base_state.AddTransition(
+            [c for c in invalid_digits if c not in NOT_CHARACTERS], self.variable)
+        base_state.SetDefault(self, excludes=invalid_digits)
+        return base_state
+
+# Stands in for the Token which ends a word.
+_WORD_END = Token('')
 
 class Dfa(object):
     def __init__(self):
@@ -81,63 +95,63 @@ class NumberVariableDfa(Dfa):
         self.VARIABLE = State('Variable')
         self.VAR = State('Var') # END state
         self.ARABIC = State('Arabic') # END state
-        self.NARY = State('Nary')
         self.NAR = State('Nar') # END state
+        self.NARY = NaryState('Nary', self.NAR, self.VARIABLE)
         self.FULLNAME = State('Fullname')
         self.FULL = State('Full') # End state
         self.SCIENTIFIC = State('Scientific')
         self.IMAGINARY = State('Imaginary')
 
-        self.START.AddDelta(lambda c: isinstance(c, Token), self.READY)
-        self.READY.AddDelta(lambda c: isinstance(c, Token), self.READY)
-        self.READY.AddDelta(lambda c: c == '负', self.NEGATIVE)
-        self.READY.AddDelta(lambda c: c == '点', self.DOT)
-        self.READY.AddDelta(self.isdigit, self.D1)
-        self.READY.AddDelta(self.ischaracter, self.VARIABLE)
-        self.READY.AddDelta(self.iss, self.FULLNAME)
-
-        self.VARIABLE.AddDelta(lambda c: isinstance(c, Token), self.VAR)
-        self.VARIABLE.AddDelta(lambda c: not isinstance(c, Token), self.VARIABLE)
-
-        self.NEGATIVE.AddDelta(self.iss, self.FULLNAME)
-        self.NEGATIVE.AddDelta(self.isdigit, self.D1)
-
-        self.FULLNAME.AddDelta(lambda c: isinstance(c, Token), self.FULL)
-        self.FULLNAME.AddDelta(lambda c: self.isdigit(c) or self.iss(c), self.FULLNAME)
-
-        self.D1.AddDelta(lambda c: isinstance(c, Token), self.ARABIC)
-        self.D1.AddDelta(self.iss, self.FULLNAME)
-        self.D1.AddDelta(lambda c: c == '进', self.NARY)
-        self.D1.AddDelta(lambda c: c == 'E', self.SCIENTIFIC)
-        self.D1.AddDelta(self.isdigit, self.D2)
-        self.D1.AddDelta(lambda c: c == '点', self.DOT)
-        self.D1.AddDelta(self.ischaracter, self.VARIABLE)
-        self.D1.AddDelta(lambda c: c == 'i', self.IMAGINARY)
-
-        self.NARY.AddDelta(lambda c, b: isinstance(c, Token), self.NAR)
-        self.NARY.AddDelta(self.isvaliddigit, self.NARY)
-        self.NARY.AddDelta(self.ischaracter, self.VARIABLE)
-
-        self.SCIENTIFIC.AddDelta(lambda c: isinstance(c, Token), self.ARABIC)
-        self.SCIENTIFIC.AddDelta(self.isdigit, self.SCIENTIFIC)
-        self.SCIENTIFIC.AddDelta(lambda c: c == 'i', self.IMAGINARY)
-
-        self.D2.AddDelta(lambda c: isinstance(c, Token), self.ARABIC)
-        self.D2.AddDelta(self.isdigit, self.D2)
-        self.D2.AddDelta(lambda c: c == '进', self.NARY)
-        self.D2.AddDelta(lambda c: c == '点', self.DOT)
-        self.D2.AddDelta(lambda c: c == 'E', self.SCIENTIFIC)
-        self.D2.AddDelta(self.ischaracter, self.VARIABLE)
-        self.D2.AddDelta(lambda c: c == 'i', self.IMAGINARY)
-
-        self.DOT.AddDelta(lambda c: isinstance(c, Token), self.ARABIC)
-        self.DOT.AddDelta(self.isdigit, self.DOT)
-        self.DOT.AddDelta(self.ischaracter, self.VARIABLE)
-        self.DOT.AddDelta(lambda c: c == 'E', self.SCIENTIFIC)
-        self.DOT.AddDelta(lambda c: c == 'i', self.IMAGINARY)
-
-        self.IMAGINARY.AddDelta(lambda c: isinstance(c, Token), self.ARABIC)
-
+        # Earlier transitions take priority over later ones.  Characters which
+        # are not in NOT_CHARACTERS default to a variable name.
+        self.START.AddTransition([TOKEN], self.READY)
+        self.READY.AddTransition([TOKEN], self.READY)
+        self.READY.AddTransition('负', self.NEGATIVE)
+        self.READY.AddTransition('点', self.DOT)
+        self.READY.AddTransition(DIGITS, self.D1)
+        self.READY.AddTransition(UNITS, self.FULLNAME)
+        self.READY.SetDefault(self.VARIABLE, excludes=NOT_CHARACTERS)
+
+        self.VARIABLE.AddTransition([TOKEN], self.VAR)
+        self.VARIABLE.SetDefault(self.VARIABLE)
+
+        self.NEGATIVE.AddTransition(UNITS, self.FULLNAME)
+        self.NEGATIVE.AddTransition(DIGITS, self.D1)
+
+        self.FULLNAME.AddTransition([TOKEN], self.FULL)
+        self.FULLNAME.AddTransition(DIGITS + UNITS, self.FULLNAME)
+
+        # 'i' is a variable character, so it never reaches IMAGINARY from here.
+        self.D1.AddTransition([TOKEN], self.ARABIC)
+        self.D1.AddTransition(UNITS, self.FULLNAME)
+        self.D1.AddTransition('进', self.NARY)
+        self.D1.AddTransition('E', self.SCIENTIFIC)
+        self.D1.AddTransition(DIGITS, self.D2)
+        self.D1.AddTransition('点', self.DOT)
+        self.D1.SetDefault(self.VARIABLE, excludes=NOT_CHARACTERS)
+
+        self.SCIENTIFIC.AddTransition([TOKEN], self.ARABIC)
+        self.SCIENTIFIC.AddTransition(DIGITS, self.SCIENTIFIC)
+        self.SCIENTIFIC.AddTransition('i', self.IMAGINARY)
+
+        self.D2.AddTransition([TOKEN], self.ARABIC)
+        self.D2.AddTransition(DIGITS, self.D2)
+        self.D2.AddTransition('进', self.NARY)
+        self.D2.AddTransition('点', self.DOT)
+        self.D2.AddTransition('E', self.SCIENTIFIC)
+        self.D2.SetDefault(self.VARIABLE, excludes=NOT_CHARACTERS)
+
+        self.DOT.AddTransition([TOKEN], self.ARABIC)
+        self.DOT.AddTransition(DIGITS, self.DOT)
+        self.DOT.AddTransition('E', self.SCIENTIFIC)
+        self.DOT.SetDefault(self.VARIABLE, excludes=NOT_CHARACTERS)
+
+        self.IMAGINARY.AddTransition([TOKEN], self.ARABIC)
+
+        # The format of each word seen by WordToken, None for variables.
+        self.word_formats = {}
+        self.word_hits = 0
+        self.word_misses = 0
 
     def isdigit(self, char):
         return char in '零一二三四五六七八九'
@@ -159,8 +173,15 @@ class NumberVariableDfa(Dfa):
         Args:
             char: string of a single character.
         """
-        # print(self.state.name)
-        self.state = self.state.GetNextState(char)
+        state = self.state
+        ns = state.GetNextState(char)
+        if state is self.READY and ns is not self.READY:
+            self.READY.just_started = True
+        if ns is self.D1 or ns is self.D2:
+            ns.base_s = state.base_s + number_symbols[char]
+        elif ns is self.NARY and state is not self.NARY:
+            ns.base_i = int(state.base_s)
+        self.state = ns
 
 
     def ReplaceTokens(self, tokens):
@@ -204,3 +225,39 @@ class NumberVariableDfa(Dfa):
             else:
                 s += token
         return res
+
+    def WordToken(self, word):
+        """Creates the Number or Variable Token for a word between two Tokens.
+
+        Gives the same Token as ReplaceTokens does for the same characters,
+        remembering the result for each word.
+
+        Args:
+            word: string The characters between two Tokens.
+        Raises:
+            DfaException on invalid number formats
+        Returns:
+            NumberToken|VariableToken
+        """
+        if word in self.word_formats:
+            self.word_hits += 1
+        else:
+            self.word_misses += 1
+            self.state = self.READY
+            for c in word:
+                self.transition(c)
+            self.transition(_WORD_END)
+            end, self.state = self.state, self.READY
+            self.READY.just_started = False
+            if end == self.ARABIC:
+                self.word_formats[word] = NumberFormat.ARABIC
+            elif end == self.NAR:
+                self.word_formats[word] = NumberFormat.NARY
+            elif end == self.FULL:
+                self.word_formats[word] = NumberFormat.FULLNAME
+            else:
+                self.word_formats[word] = None
+        number_format = self.word_formats[word]
+        if number_format is None:
+            return VariableToken(word)
+        return NumberToken(word, format = number_format)
@@ -65,3 +65,11 @@ class NumberVariableDfaTest(unittest.TestCase):
     for word in reserved_beginning_words:
       var = '啊' + word
       self.RunTestCase(CreateTestCase(var), CreateExpectedValue(VariableToken(var)))
+
+  def testParsesHexadecimal(self):
+    self.RunTestCase(
+        CreateTestCase('一六进ABF'),
+        CreateExpectedValue(NumberToken('一六进ABF', NumberFormat.NARY)))
+
+  def testRejectsDigitsTooLargeForBase(self):
+    self.assertRaises(DfaException, self.dfa.ReplaceTokens, CreateTestCase('二进一二'))
@@ -0,0 +1,148 @@
+"""Splits lines of .cha into Tokens with a single regular expression."""
+
+import functools
+import re
+
+from cha_token import StringToken, MultilineStringToken, SymbolToken, ReservedWordToken, WhitespaceToken, EndToken
+from cha_translation import reserved_symbols, reserved_beginning_words, BuildTrie, TRIE_END
+from dfa import DfaException
+
+# Whitespace which is removed from between the characters of symbols and words.
+WHITESPACE = ' \t\n'
+_REMOVE_WHITESPACE = {ord(c): None for c in WHITESPACE}
+_SPACE = r'[ \t\n]*'
+# The group of each kind of match in the patterns of RegexLexer.
+WORD, SYMBOL, STRING, QUOTE, COMMENT = range(1, 6)
+
+def TriePattern(trie):
+  """Builds a pattern matching the longest word of a trie.
+
+  Whitespace may come between the characters of a word, the same as words
+  are found after whitespace is removed.
+
+  e.g.
+  TriePattern(BuildTrie(['是', '是不是']))
+    => '(?:是(?:[ \\t\\n]*(?:不(?:[ \\t\\n]*(?:是))))?)'
+
+  Args:
+    trie: dict A trie created by BuildTrie.
+  Returns:
+    string A regular expression, which never matches if trie is empty.
+  """
+  branches = []
+  for c, child in sorted(trie.items()):
+    if c == TRIE_END:
+      continue
+    pattern = re.escape(c)
+    if len(child) > (TRIE_END in child):
+      pattern += '(?:%s%s)' % (_SPACE, TriePattern(child))
+      if TRIE_END in child:
+        pattern += '?'
+    branches.append(pattern)
+  if not branches:
+    return '(?!)'
+  return '(?:%s)' % '|'.join(branches)
+
+@functools.lru_cache(maxsize=None)
+def _Patterns(start_quote, end_quote, escape, comment):
+  """Compiles the patterns of RegexLexer, once for each set of characters."""
+  symbols = TriePattern(BuildTrie(reserved_symbols))
+  beginning_words = TriePattern(BuildTrie(reserved_beginning_words))
+  # Characters starting a symbol only belong to a word if no symbol starts there.
+  firsts = re.escape(''.join(sorted({s[0] for s in reserved_symbols if s})))
+  word_char = r'[^%s \t\n%s%s]|(?!%s)[%s]' % (
+      firsts, re.escape(start_quote), re.escape(comment), symbols, firsts)
+  # Whitespace before each Token is skipped, so only Tokens are matched.
+  pattern = r'[ \t\n]*(?:%s)' % '|'.join((
+      r'((?:%s)(?:[ \t\n]|%s)*)' % (word_char, word_char),
+      '(%s)' % symbols,
+      r'(%s(?:[^%s]|%s[\s\S])*%s)' % (
+          re.escape(start_quote), re.escape(escape + end_quote), re.escape(escape),
+          re.escape(end_quote)),
+      '(%s)' % re.escape(start_quote),
+      r'(%s[\s\S]*)' % re.escape(comment),
+  ))
+  return re.compile(pattern), re.compile(r'[ \t]*'), re.compile(_SPACE + beginning_words)
+
+class RegexLexer(object):
+  """Finds the Tokens of a line using one regular expression.
+
+  Gives the same Tokens as the pipeline of automata in ChaParser, but most
+  of the scanning happens inside the regular expression engine. Multiline
+  strings are found first by MultilineStringDfa.FindSpans, as they are in
+  the pipeline, and everything between them by a single alternation of
+  strings, comments, whitespace, symbols and words.
+
+  e.g.
+  RegexLexer('“', '”').Tokenize('甲是“乙”  #丙\\n', [], NumberVariableDfa().WordToken)
+    => [WhitespaceToken(''), VariableToken('甲'), SymbolToken('是'),
+        StringToken('“乙”'), EndToken('#丙\\n')]
+  """
+  def __init__(self, start_quote='"', end_quote='"', escape='\\', comment='#'):
+    self.pattern, self.indent, self.beginning_word = _Patterns(
+        start_quote, end_quote, escape, comment)
+    # The Token of each symbol written without whitespace.
+    self.symbols = {s: SymbolToken.Intern(s) for s in reserved_symbols if s}
+
+  def Tokenize(self, line, spans, word_token):
+    """Splits a line into Tokens.
+
+    Args:
+      line: string The line to split.
+      spans: Array[(number, number)] Where the MultilineStringTokens are, as
+          returned by MultilineStringDfa.FindSpans.
+      word_token: function(string) Gives the Number or Variable Token of a word.
+    Raises:
+      DfaException on an uneven number of strings, or invalid numbers.
+    Returns:
+      Array[Token]
+    """
+    first_end = spans[0][0] if spans else len(line)
+    start = self.indent.match(line, 0, first_end).end()
+    tokens = [WhitespaceToken.Intern(line[:start])]
+    match = self.beginning_word.match(line, start, first_end)
+    if match is not None:
+      tokens.append(ReservedWordToken.Intern(match.group().translate(_REMOVE_WHITESPACE)))
+      start = match.end()
+    # Strings are checked before numbers in the pipeline, so errors in words
+    # are only raised once the whole line was scanned.
+    errors = []
+    for (span_start, span_end) in spans:
+      if self._AddTokens(line, start, span_start, tokens, word_token, errors) is not None:
+        raise DfaException('Cannot transition with a non string character: %s' % line[span_start:])
+      tokens.append(MultilineStringToken(line[span_start:span_end]))
+      start = span_end
+    comment = self._AddTokens(line, start, len(line), tokens, word_token, errors)
+    if errors:
+      raise errors[0]
+    tokens.append(EndToken.Intern('') if comment is None else EndToken(comment))
+    return tokens
+
+  def _AddTokens(self, line, start, end, tokens, word_token, errors):
+    """Adds the Tokens between start and end to tokens, and errors in words to errors.
+
+    Returns:
+      string|None The comment, which runs to the end of the line, if found.
+    """
+    for match in self.pattern.finditer(line, start, end):
+      kind = match.lastindex
+      text = match[kind]
+      if kind == WORD:
+        try:
+          tokens.append(word_token(text.translate(_REMOVE_WHITESPACE)))
+        except Exception as e:
+          errors.append(e)
+      elif kind == SYMBOL:
+        token = self.symbols.get(text)
+        if token is None:
+          token = self.symbols[text.translate(_REMOVE_WHITESPACE)]
+        tokens.append(token)
+      elif kind == STRING:
+        tokens.append(StringToken(text))
+      elif kind == COMMENT:
+        return text
+      else:
+        if end < len(line):
+          raise DfaException('Cannot transition with a non string character: %s' % line[end:])
+        raise DfaException('String parsing not completed before EOL, uneven number of quotes')
+    return None
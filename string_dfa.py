@@ -2,6 +2,8 @@
 
 """Utility to extract String Tokens from an array of tokens."""
 
+import re
+
 from cha_token import StringToken, MultilineStringToken
 from dfa import Dfa, DfaException, State
 
@@ -14,18 +16,24 @@ class StringDfa(Dfa):
       escape: Optional[string] The escape character to use.
     """
     super().__init__()
+    self.start_quote = start_quote
+    self.end_quote = end_quote
+    self.comment = comment
+    # Characters which end a run of string contents.
+    self.special = re.compile('[%s]' % re.escape(escape + end_quote))
+
     self.INSIDE = State('Inside')
     self.ESCAPE = State('Escape')
     self.COMMENT = State('Comment')
 
-    self.START.AddDelta(lambda c: c == start_quote, self.INSIDE)
-    self.START.AddDelta(lambda c: c == comment, self.COMMENT)
-    self.START.AddDelta(lambda c: True, self.START)
-    self.INSIDE.AddDelta(lambda c: c == escape, self.ESCAPE)
-    self.INSIDE.AddDelta(lambda c: c == end_quote, self.END)
-    self.INSIDE.AddDelta(lambda c: c not in [end_quote, escape], self.INSIDE)
-    self.ESCAPE.AddDelta(lambda c: True, self.INSIDE)
-    self.COMMENT.AddDelta(lambda c: True, self.COMMENT)
+    self.START.AddTransition(start_quote, self.INSIDE)
+    self.START.AddTransition(comment, self.COMMENT)
+    self.START.SetDefault(self.START)
+    self.INSIDE.AddTransition(escape, self.ESCAPE)
+    self.INSIDE.AddTransition(end_quote, self.END)
+    self.INSIDE.SetDefault(self.INSIDE)
+    self.ESCAPE.SetDefault(self.INSIDE)
+    self.COMMENT.SetDefault(self.COMMENT)
 
   def transition(self, char):
     """Transition the Dfa's current state given a charself.
@@ -73,9 +81,92 @@ class StringDfa(Dfa):
       self.state = self.START
     return res
 
+  def FindStringEnd(self, line, start, end):
+    """Finds the end of a string without going through every character.
+
+    Args:
+      line: string The line containing the string.
+      start: number The index right after the opening quote.
+      end: number The index the string must end before. Either the end of
+          the line or the start of a MultilineStringToken.
+    Raises:
+      DfaException when the string does not end before end.
+    Returns:
+      number The index right after the closing quote.
+    """
+    i = start
+    while i <= end:
+      match = self.special.search(line, i, end)
+      if match is None:
+        break
+      if match.group() == self.end_quote:
+        return match.end()
+      # Escapes skip over the next character.
+      i = match.end() + 1
+    if end < len(line):
+      raise DfaException('Cannot transition with a non string character: %s' % line[end:])
+    raise DfaException('String parsing not completed before EOL, uneven number of quotes')
+
+  def SplitLine(self, line, spans=()):
+    """Splits a line into text, StringTokens and MultilineStringTokens.
+
+    Finds the same strings as ReplaceTokens, but keeps the text between
+    tokens whole instead of as characters, and splits off the comment.
+
+    e.g.
+    .SplitLine('a = "b" # c')
+      => (['a = ', StringToken('"b"'), ' '], '# c')
+
+    Args:
+      line: string The line to split.
+      spans: Array[(number, number)] Where the MultilineStringTokens are, as
+          returned by MultilineStringDfa.FindSpans.
+    Raises:
+      DfaException on an uneven number of strings
+    Returns:
+      (Array[string|StringToken|MultilineStringToken], string|None) The
+      pieces of the line and the comment, None if there is no comment.
+    """
+    pieces = []
+    start = 0
+    for (span_start, span_end) in spans:
+      comment = self._SplitText(line, start, span_start, pieces)
+      if comment is not None:
+        raise DfaException('Cannot transition with a non string character: %s' % line[span_start:])
+      pieces.append(MultilineStringToken(line[span_start:span_end]))
+      start = span_end
+    comment = self._SplitText(line, start, len(line), pieces)
+    return pieces, comment
+
+  def _SplitText(self, line, start, end, pieces):
+    """Adds the text and strings between start and end to pieces.
+
+    Returns:
+      string|None The comment, which runs to the end of the line, if found.
+    """
+    i = start
+    while True:
+      quote = line.find(self.start_quote, i, end)
+      comment = line.find(self.comment, i, end if quote < 0 else quote)
+      if comment >= 0:
+        pieces.append(line[i:comment])
+        return line[comment:]
+      if quote < 0:
+        pieces.append(line[i:end])
+        return None
+      pieces.append(line[i:quote])
+      i = self.FindStringEnd(line, quote + 1, end)
+      pieces.append(StringToken(line[quote:i]))
+
 class MultilineStringDfa(Dfa):
   def __init__(self, start_quote='"', end_quote='"', escape='\\', comment='#'):
     super().__init__()
+    self.start_quote = start_quote
+    self.end_quote = end_quote
+    self.comment = comment
+    # Characters which may end the multiline.
+    self.special = re.compile('[%s]' % re.escape(escape + end_quote))
+
     # Single Quote found
     self.Q1 = State('Q1')
     # Double Quote found
@@ -94,33 +185,25 @@ class MultilineStringDfa(Dfa):
 
     self.inside = False
 
-    is_start_quote = lambda c: c == start_quote
-    not_start_quote = lambda c: c != start_quote
-    is_end_quote = lambda c: c == end_quote
-    not_end_quote = lambda c: c != end_quote
-    default = lambda c: True
-
-    is_comment = lambda c: c == comment
-
-    self.START.AddDelta(is_start_quote, self.Q1)
-    self.START.AddDelta(is_comment, self.COMMENT)
-    self.START.AddDelta(default, self.START)
-    self.Q1.AddDelta(is_start_quote, self.Q2)
-    self.Q1.AddDelta(default, self.START)
-    self.Q1.AddDelta(is_comment, self.COMMENT)
-    self.Q2.AddDelta(is_start_quote, self.INSIDE)
-    self.Q2.AddDelta(is_comment, self.COMMENT)
-    self.Q2.AddDelta(default, self.START)
-    self.INSIDE.AddDelta(lambda c: c == escape, self.ESCAPE)
-    self.INSIDE.AddDelta(is_end_quote, self.U1)
-    self.INSIDE.AddDelta(default, self.INSIDE)
-    self.ESCAPE.AddDelta(default, self.INSIDE)
-    self.U1.AddDelta(is_end_quote, self.U2)
-    self.U1.AddDelta(default, self.INSIDE)
-    self.U2.AddDelta(is_end_quote, self.END)
-    self.U2.AddDelta(default, self.INSIDE)
-
-    self.COMMENT.AddDelta(default, self.COMMENT)
+    self.START.AddTransition(start_quote, self.Q1)
+    self.START.AddTransition(comment, self.COMMENT)
+    self.START.SetDefault(self.START)
+    # A comment right after the first quote is not a comment.
+    self.Q1.AddTransition(start_quote, self.Q2)
+    self.Q1.SetDefault(self.START)
+    self.Q2.AddTransition(start_quote, self.INSIDE)
+    self.Q2.AddTransition(comment, self.COMMENT)
+    self.Q2.SetDefault(self.START)
+    self.INSIDE.AddTransition(escape, self.ESCAPE)
+    self.INSIDE.AddTransition(end_quote, self.U1)
+    self.INSIDE.SetDefault(self.INSIDE)
+    self.ESCAPE.SetDefault(self.INSIDE)
+    self.U1.AddTransition(end_quote, self.U2)
+    self.U1.SetDefault(self.INSIDE)
+    self.U2.AddTransition(end_quote, self.END)
+    self.U2.SetDefault(self.INSIDE)
+
+    self.COMMENT.SetDefault(self.COMMENT)
 
   def ReplaceTokens(self, tokens, inside=False):
     """Replaces tokens with MultilineStringToken for valid syntaxes.
@@ -159,6 +242,72 @@ class MultilineStringDfa(Dfa):
 
     return res
 
+  def FindSpans(self, line, inside=False):
+    """Finds multiline strings without going through every character.
+
+    Finds the same MultilineStringTokens as ReplaceTokens, and updates
+    inside the same way.
+
+    e.g.
+    MultilineStringDfa('“', '”').FindSpans('a = “““b””” + “““c')
+      => [(4, 11), (14, 18)]
+
+    Args:
+      line: string The line to search.
+      inside: Optional[bool] Whether this line starts as part of a multiline.
+    Returns:
+      Array[(number, number)] The start and end index of each token.
+    """
+    spans = []
+    n = len(line)
+    i = 0
+    if inside:
+      i = self._FindEnd(line, 0)
+      if i < 0:
+        self.inside = True
+        return [(0, n)]
+      spans.append((0, i))
+    while True:
+      quote = line.find(self.start_quote, i)
+      if quote < 0 or line.find(self.comment, i, quote) >= 0:
+        break
+      if line[quote + 1:quote + 2] != self.start_quote:
+        # Q1 goes back to Start on any other character, even a comment.
+        i = quote + 2
+        continue
+      third = line[quote + 2:quote + 3]
+      if not third or third == self.comment:
+        break
+      if third != self.start_quote:
+        i = quote + 3
+        continue
+      i = self._FindEnd(line, quote + 3)
+      if i < 0:
+        spans.append((quote, n))
+        self.inside = True
+        return spans
+      spans.append((quote, i))
+    self.inside = False
+    return spans
+
+  def _FindEnd(self, line, start):
+    """Returns the index right after the end of a multiline, or -1 if it does not end."""
+    i = start
+    while True:
+      match = self.special.search(line, i)
+      if match is None:
+        return -1
+      i = match.end()
+      if match.group() != self.end_quote:
+        # Escapes skip over the next character.
+        i += 1
+      elif line[i:i + 1] != self.end_quote:
+        i += 1
+      elif line[i + 1:i + 2] != self.end_quote:
+        i += 2
+      else:
+        return i + 2
+
 
 if __name__ == '__main__':
   my = StringDfa()